@@ -1,33 +1,21 @@
 import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.daily import expand_daily
+from common.storage import read_dataset
+
 file_path_input = os.path.abspath("data/dauerzaehlstellen_data.csv")
 file_path_output = os.path.abspath("output/analysis_tvmax_timeseries_graph.png")
 
-df = pd.read_csv(file_path_input, sep=",", dtype={"ZNR": str}, parse_dates=["DATUM"])
-
-def make_daily_df(df_area):
-    rows = []
-    for _,r in df_area.iterrows():
-        start = r["DATUM"].replace(day=1)
-        end   = start + pd.offsets.MonthEnd(0)
-        for d in pd.date_range(start, end, freq = "D"):
-            wd = d.weekday()
-            if wd == 0:        y=r["DTVMO"]
-            elif 1 <= wd <= 3: y=r["DTVDD"]
-            elif wd == 4:      y=r["DTVFR"]
-            elif wd == 5:      y=r["DTVSA"]
-            else:              y=r["DTVSF"]
-            rows.append({"DATUM": d, "COUNT": y, "FZTYP": r["FZTYP"]})
-
-    return pd.DataFrame(rows).dropna().sort_values("DATUM").reset_index(drop=True)
+df = read_dataset(file_path_input, "counts", columns=["DATUM", "ZNR", "RINAME", "FZTYP", "DTVMO", "DTVDD", "DTVFR", "DTVSA", "DTVSF"], filters=[("RINAME", "=", "Gesamt")])
 
-df = df[df["RINAME"] == "Gesamt"]
-df["FZTYP"] = df["FZTYP"].replace("LkwÄ", "Lkw")
+df["FZTYP"] = df["FZTYP"].astype(str).replace("LkwÄ", "Lkw")
 
-df = make_daily_df(df)
+df = expand_daily(df, keep=["FZTYP"]).rename(columns={"ds": "DATUM", "y": "COUNT"})
 
 df["Monat"] = df["DATUM"].dt.to_period("M").dt.to_timestamp()
 df = df.groupby(["Monat", "FZTYP"], as_index=False)["COUNT"].sum()
@@ -0,0 +1,142 @@
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import DateOffset
+
+from common.model_cache import ModelCache
+from common.sarima_engine import (build_panel, exog_at, fit_with_fallback, EXOG_COLUMNS, ORDER, SEASONAL_ORDER, PROPHET_PARAMS)
+from common.prophet_fit import fit_prophet
+
+MODELS = ["sarimax", "sarima", "prophet"]
+MIN_TRAIN = 36
+
+RESULT_COLUMNS = ["ZNR", "origin", "model", "status", "cached", "n_train", "n_test", "rmse", "mape", "fit_seconds", "predict_seconds"]
+
+def rmse(y, yhat):
+    return float(np.sqrt(np.mean((y - yhat) ** 2)))
+
+def mape(y, yhat):
+    # Months without traffic have no percentage error
+    nonzero = y != 0
+    return float(np.mean(np.abs((y[nonzero] - yhat[nonzero]) / y[nonzero])) * 100) if nonzero.any() else np.nan
+
+def station_jobs(df, origins, horizon_months, models=MODELS, exog_columns=EXOG_COLUMNS, cache_directory=None):
+    """
+    One backtest job per station of the monthly panel, carrying only that station's rows.
+    """
+    panel = build_panel(df, exog_columns)
+    origins = [np.datetime64(pd.Timestamp(origin), "ns") for origin in origins]
+
+    return [
+        (znr, panel.dates[start:end], panel.y[start:end], panel.exog[start:end], exog_columns, origins, horizon_months, models, cache_directory)
+        for znr, start, end in zip(panel.keys, panel.offsets[:-1], panel.offsets[1:])
+    ]
+
+def backtest_station(job):
+    """
+    Fits every model on the station's months up to each origin and scores it on the observed months of the following horizon.
+    Returns one result row per origin and model with the errors and the fit and predict wall-clock time.
+    A fit that raises gives a row with status "error" and no errors, the other folds and stations go on.
+    """
+    znr, dates, y, exog, exog_columns, origins, horizon_months, models, cache_directory = job
+    cache = ModelCache(cache_directory) if cache_directory else None
+    rows = []
+
+    for origin in origins:
+        train = dates <= origin
+        has_y = ~np.isnan(y)
+        if (train & has_y).sum() < MIN_TRAIN:
+            continue
+
+        test_dates = pd.date_range(pd.Timestamp(origin) + DateOffset(months=1), periods=horizon_months, freq="MS")
+        test = np.isin(dates, test_dates.to_numpy()) & has_y
+        if not test.any():
+            continue
+
+        # Predictions cover every month of the horizon, the score only the observed ones
+        scored = np.isin(test_dates.to_numpy(), dates[test])
+        y_test = y[test]
+
+        for model in models:
+            hits = cache.hits if cache else 0
+            try:
+                status, fit_seconds, yhat, predict_seconds = fit_and_predict(model, dates, y, exog, exog_columns, train, has_y, test_dates, cache)
+            except Exception as e:
+                print(f"Station {znr}, origin {pd.Timestamp(origin):%Y-%m}, {model}: {type(e).__name__}: {e}")
+                status, fit_seconds, yhat, predict_seconds = "error", np.nan, np.full(len(test_dates), np.nan), np.nan
+            yhat = yhat[scored]
+
+            rows.append({
+                "ZNR": znr, "origin": pd.Timestamp(origin), "model": model, "status": status,
+                # Loaded from the model cache, the fit time is not a fit
+                "cached": bool(cache) and cache.hits > hits,
+                "n_train": int((train & has_y).sum()), "n_test": len(y_test),
+                "rmse": rmse(y_test, yhat), "mape": mape(y_test, yhat),
+                "fit_seconds": fit_seconds, "predict_seconds": predict_seconds,
+            })
+
+    return rows
+
+def fit_and_predict(model, dates, y, exog, exog_columns, train, has_y, test_dates, cache):
+    """
+    One model of one fold: the fit status, fit seconds, predictions for every month of the horizon and predict seconds.
+    """
+    train_dates = pd.DatetimeIndex(dates[train], name="DATE")
+    start = time.perf_counter()
+
+    if model == "prophet":
+        df_prop = pd.DataFrame(exog[train & has_y], columns=exog_columns)
+        df_prop.insert(0, "ds", dates[train & has_y])
+        df_prop.insert(1, "y", y[train & has_y])
+        m = fit_prophet(df_prop, PROPHET_PARAMS, cache=cache, regressors=exog_columns)
+        status = "fitted"
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        future = pd.DataFrame({"ds": test_dates})
+        future[exog_columns] = exog_at(dates, exog, test_dates)
+        yhat = m.predict(future)["yhat"].to_numpy()
+    else:
+        endog = pd.Series(y[train], index=train_dates, name="DTVMS")
+        exog_train = pd.DataFrame(exog[train], index=train_dates, columns=exog_columns) if model == "sarimax" else None
+        res, status = fit_with_fallback(endog, ORDER, SEASONAL_ORDER, exog_train, cache=cache)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if res is None:
+            yhat = np.full(len(test_dates), np.nan)
+        else:
+            # Forecasts start after the last training month, which is before the origin for stations with a gap
+            forecast_dates = pd.date_range(train_dates[-1] + DateOffset(months=1), test_dates[-1], freq="MS")
+            exog_test = exog_at(dates, exog, forecast_dates) if model == "sarimax" else None
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                yhat = res.get_forecast(steps=len(forecast_dates), exog=exog_test).predicted_mean.to_numpy()[-len(test_dates):]
+
+    return status, fit_seconds, yhat, time.perf_counter() - start
+
+def summarize(results):
+    """
+    Mean error and mean time per model over all stations and origins. Fit times only count folds that were fitted,
+    not loaded from the model cache, and folds whose fit raised are counted as errors.
+    """
+    fitted = results["fit_seconds"].where(~results["cached"].astype(bool))
+    return results.assign(fit_seconds=fitted, seconds=fitted.fillna(0) + results["predict_seconds"].fillna(0),
+                          error=results["status"] == "error").groupby("model").agg(
+        folds=("rmse", "size"), errors=("error", "sum"), cached=("cached", "sum"), rmse=("rmse", "mean"), mape=("mape", "mean"),
+        fit_seconds=("fit_seconds", "mean"), predict_seconds=("predict_seconds", "mean"), total_seconds=("seconds", "sum"),
+    )
+
+def ensemble_weights(results, trim_quantile=0.95):
+    """
+    Inverse-RMSE ensemble weights from the per-station mean RMSE of each model over all origins.
+    Stations where any model's RMSE is above that model's trim_quantile are left out, as in forecasting.ipynb.
+    Returns the weights and the left out stations.
+    """
+    station_rmse = results.pivot_table(index="ZNR", columns="model", values="rmse", aggfunc="mean").dropna()
+    cuts = station_rmse.quantile(trim_quantile)
+    good = (station_rmse <= cuts).all(axis=1)
+
+    inverse = 1 / station_rmse[good].mean()
+    return inverse / inverse.sum(), station_rmse.index[~good].tolist()
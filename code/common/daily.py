@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+# Weekday (Monday = 0) to the monthly profile column holding that day's average
+WEEKDAY_COLUMNS = ["DTVMO", "DTVDD", "DTVDD", "DTVDD", "DTVFR", "DTVSA", "DTVSF"]
+PROFILE_COLUMNS = ["DTVMO", "DTVDD", "DTVFR", "DTVSA", "DTVSF"]
+WEEKDAY_TO_PROFILE = np.array([PROFILE_COLUMNS.index(c) for c in WEEKDAY_COLUMNS])
+
+TARGET_WEEKDAY = "weekday"
+TARGET_TVMAX = "TVMAX"
+
+ExpandedGroups = namedtuple("ExpandedGroups", ["keys", "offsets", "ds", "y"])
+
+def _monthly_values(df_monthly, target):
+    """
+    Returns a (rows, k) value matrix and a per-day column picker for the given target.
+    """
+    if target == TARGET_WEEKDAY:
+        return df_monthly[PROFILE_COLUMNS].to_numpy(dtype=float), WEEKDAY_TO_PROFILE
+
+    # Any other target is a single column repeated for every day of the month (e.g. TVMAX)
+    return df_monthly[[target]].to_numpy(dtype=float), np.zeros(7, dtype=int)
+
+def expand_arrays(df_monthly, target=TARGET_WEEKDAY, date_col="DATUM"):
+    """
+    Expands monthly rows to one entry per calendar day in a single vectorized pass.
+    Returns the daily dates (datetime64[D]), values and the source row of each day, unsorted and including NaN values.
+    """
+    months = df_monthly[date_col].to_numpy().astype("datetime64[M]")
+    month_start = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+
+    row = np.repeat(np.arange(len(months)), days_in_month)
+    first_day = np.cumsum(days_in_month) - days_in_month
+    day_of_month = np.arange(len(row)) - np.repeat(first_day, days_in_month)
+    ds = month_start[row] + day_of_month
+
+    # 1970-01-01 was a Thursday, shift by 3 so that Monday = 0
+    weekday = (ds.astype(np.int64) + 3) % 7
+
+    values, picker = _monthly_values(df_monthly, target)
+    y = values[row, picker[weekday]]
+
+    return ds, y, row
+
+def expand_daily(df_monthly, target=TARGET_WEEKDAY, date_col="DATUM", keep=()):
+    """
+    Vectorized replacement for make_daily_df: daily "ds"/"y" frame sorted by date without missing values.
+    Columns listed in keep are carried over from the monthly row of each day.
+    """
+    ds, y, row = expand_arrays(df_monthly, target, date_col)
+
+    valid = ~np.isnan(y)
+    ds, y, row = ds[valid], y[valid], row[valid]
+    order = np.argsort(ds, kind="stable")
+
+    df_daily = pd.DataFrame({"ds": ds[order].astype("datetime64[ns]"), "y": y[order]})
+    for col in keep:
+        df_daily[col] = df_monthly[col].to_numpy()[row[order]]
+
+    return df_daily
+
+def expand_groups(df_monthly, by="ZNR", target=TARGET_WEEKDAY, date_col="DATUM"):
+    """
+    Expands every group (station) at once. Groups keep their order of first appearance,
+    days within a group are sorted by date. The days of group i are ds[offsets[i]:offsets[i + 1]].
+    """
+    codes, keys = pd.factorize(df_monthly[by], sort=False)
+    ds, y, row = expand_arrays(df_monthly, target, date_col)
+
+    valid = ~np.isnan(y)
+    ds, y, group = ds[valid], y[valid], codes[row[valid]]
+    order = np.lexsort((ds, group))
+    ds, y, group = ds[order], y[order], group[order]
+
+    offsets = np.searchsorted(group, np.arange(len(keys) + 1), side="left")
+
+    return ExpandedGroups(keys=np.asarray(keys), offsets=offsets, ds=ds.astype("datetime64[ns]"), y=y)
+
+def group_frame(groups, i):
+    """
+    Daily "ds"/"y" frame of the i-th group of an expand_groups result.
+    """
+    start, end = groups.offsets[i], groups.offsets[i + 1]
+    return pd.DataFrame({"ds": groups.ds[start:end], "y": groups.y[start:end]})
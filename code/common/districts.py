@@ -0,0 +1,71 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+DISTRICT_COLUMNS = ["NAMEK", "DISTRICT_CODE", "BEZNR", "STATAUSTRIA_BEZ_CODE"]
+
+def load_districts(file_path_geojson, file_path_cache=None):
+    """
+    Loads the Bezirksgrenzen GeoJSON (EPSG:31256) as WGS 84 (EPSG:4326).
+    The reprojected polygons are cached on disk and reused as long as the cache is newer than the source file.
+    """
+    if file_path_cache is None:
+        file_path_cache = os.path.splitext(file_path_geojson)[0] + "_4326.geojson"
+
+    if os.path.exists(file_path_cache) and os.path.getmtime(file_path_cache) >= os.path.getmtime(file_path_geojson):
+        return gpd.read_file(file_path_cache)
+
+    with open(file_path_geojson, encoding="utf-8") as f:
+        geojson_data = json.load(f)
+
+    # Set the CRS of the GeoJSON (EPSG:31256) and transform it to WGS 84 (EPSG:4326)
+    geo_df = gpd.GeoDataFrame.from_features(geojson_data["features"])
+    geo_df = geo_df.set_crs("EPSG:31256").to_crs("EPSG:4326")
+
+    geo_df.to_file(file_path_cache, driver="GeoJSON")
+
+    return geo_df
+
+class DistrictLocator:
+    """
+    Assigns district attributes to whole coordinate arrays using a spatial index built once over the district polygons.
+    """
+
+    def __init__(self, file_path_geojson, file_path_cache=None):
+        self.geo_df = load_districts(file_path_geojson, file_path_cache).reset_index(drop=True)
+        self.sindex = self.geo_df.sindex
+
+    def locate(self, lon, lat):
+        """
+        Returns the position of the containing district for every point, -1 if the point lies outside all districts.
+        """
+        points = gpd.points_from_xy(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float), crs="EPSG:4326")
+        point_idx, district_idx = self.sindex.query(points, predicate="within")
+
+        # Keep the first district in file order when a point matches more than one polygon
+        order = np.lexsort((district_idx, point_idx))
+        point_idx, district_idx = point_idx[order], district_idx[order]
+        first = np.unique(point_idx, return_index=True)[1]
+
+        result = np.full(len(points), -1, dtype=np.int64)
+        result[point_idx[first]] = district_idx[first]
+
+        return result
+
+    def assign(self, lon, lat, columns=DISTRICT_COLUMNS, default="Unknown"):
+        """
+        Returns a frame with the requested district columns for every point, default where no district contains the point.
+        """
+        idx = self.locate(lon, lat)
+        found = idx >= 0
+
+        result = pd.DataFrame(index=range(len(idx)))
+        for col in columns:
+            values = np.full(len(idx), default, dtype=object)
+            if col in self.geo_df.columns:
+                values[found] = self.geo_df[col].to_numpy(dtype=object)[idx[found]]
+            result[col] = values
+
+        return result
@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Default upper bound of the on-disk cache, least recently used models are evicted beyond it
+MODEL_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+def model_key(library, version, params, *arrays):
+    """
+    Content address of a fit: library name and version, hyperparameters and the bytes of every input array.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([library, version, params], sort_keys=True, default=str).encode("utf-8"))
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        if array.dtype.kind == "M":
+            array = array.astype("datetime64[ns]").view(np.int64)
+        h.update(str(array.dtype).encode("utf-8"))
+        h.update(str(array.shape).encode("utf-8"))
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+class ModelCache:
+    """
+    Serialized model fits stored by content key, one file per model, bounded to max_bytes on disk.
+    A file's modification time is its last use, eviction removes the least recently used files first.
+    """
+    def __init__(self, directory, max_bytes=MODEL_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """
+        Stored bytes for the key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """
+        Stores the bytes under the key and evicts least recently used entries beyond max_bytes.
+        """
+        path = self._path(key)
+
+        # Written to a temporary file first so parallel workers never read a half-written model
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,64 @@
+import bz2
+import gzip
+import shapely
+import xml.etree.ElementTree as ET
+from shapely.geometry import Polygon
+
+def open_osm(file_path):
+    """
+    Opens a plain, bzip2 or gzip compressed .osm file for binary reading.
+    """
+    if file_path.endswith(".bz2"):
+        return bz2.open(file_path, "rb")
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rb")
+    return open(file_path, "rb")
+
+def iter_nodes(file_path, key=None, value=None):
+    """
+    Streams (lat, lon, tags) for every node of an .osm file, optionally only nodes tagged key=value.
+    Parsed elements are cleared as soon as they are processed so memory use stays flat for multi-GB extracts.
+    """
+    with open_osm(file_path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+
+        for event, elem in context:
+            if event != "end":
+                continue
+
+            if elem.tag == "node":
+                tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+                if key is None or tags.get(key) == value:
+                    yield elem.get("lat"), elem.get("lon"), tags
+                root.clear()
+            elif elem.tag in ("way", "relation"):
+                root.clear()
+
+def read_poly(file_path):
+    """
+    Reads an osmosis polygon filter file (.poly), rings prefixed with "!" are holes.
+    """
+    outer, holes = [], []
+
+    with open(file_path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+
+    # First line is the polygon name, the final END closes the file
+    i = 1
+    while i < len(lines) and lines[i] != "END":
+        is_hole = lines[i].startswith("!")
+        i += 1
+        ring = []
+        while lines[i] != "END":
+            lon, lat = lines[i].split()[:2]
+            ring.append((float(lon), float(lat)))
+            i += 1
+        (holes if is_hole else outer).append(Polygon(ring))
+        i += 1
+
+    area = shapely.union_all(outer)
+    if holes:
+        area = area.difference(shapely.union_all(holes))
+
+    return area
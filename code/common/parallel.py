@@ -0,0 +1,39 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
+
+# Thread pools that would otherwise each grab every core inside every worker process
+THREAD_LIMIT_VARIABLES = ["STAN_NUM_THREADS", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]
+
+def limit_threads(threads=1):
+    """
+    Caps the BLAS and OpenMP threads of the current process and the Stan threads of the processes it starts.
+    The environment variables are only read when a library is loaded, forked workers inherit numpy's BLAS already
+    loaded, so its pools are resized through threadpoolctl.
+    """
+    for variable in THREAD_LIMIT_VARIABLES:
+        os.environ[variable] = str(threads)
+    threadpool_limits(threads)
+
+def _context():
+    # The scripts run their pipeline at module level, so workers are forked instead of re-importing __main__
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+def iter_jobs(func, jobs, workers=1):
+    """
+    Runs func on every job and yields (job index, result) as soon as each job finishes.
+    With workers <= 1 the jobs run one after another in this process, in job order.
+    func has to be a module-level function so it can be sent to the worker processes.
+    """
+    if workers <= 1:
+        for i, job in enumerate(jobs):
+            yield i, func(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_context(), initializer=limit_threads) as executor:
+        futures = {executor.submit(func, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
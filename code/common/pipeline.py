@@ -0,0 +1,301 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# A step of the workflow: command run in cwd, code files whose content (and common imports) it depends on,
+# files it reads and files it writes. All paths are relative to the pipeline root.
+Stage = namedtuple("Stage", ["name", "cwd", "command", "code", "inputs", "outputs"])
+
+STATUS_DONE = "done"
+STATUS_SKIPPED = "up to date"
+STATUS_FAILED = "failed"
+STATUS_BLOCKED = "blocked"
+
+COMMON_IMPORT = re.compile(r"^\s*(?:from|import)\s+common\.(\w+)", re.MULTILINE)
+
+def script_stage(name, script, inputs, outputs, cwd=".", args=()):
+    """
+    Stage running a Python script from cwd, the script path is relative to the pipeline root.
+    """
+    return Stage(name, cwd, [sys.executable, os.path.relpath(script, cwd), *args], [script], inputs, outputs)
+
+def notebook_stage(name, notebook, inputs, outputs):
+    """
+    Stage executing a notebook in its own directory. The executed copy goes to the pipeline's notebook folder,
+    so the committed notebook is not rewritten on every run.
+    """
+    return Stage(name, os.path.dirname(notebook), [sys.executable, "-m", "jupyter", "nbconvert", "--to", "notebook", "--execute", "--ExecutePreprocessor.timeout=-1"],
+                 [notebook], inputs, outputs)
+
+COPY_SCRIPT = """
+import os, sys, shutil
+for source, destination in zip(sys.argv[1::2], sys.argv[2::2]):
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    # Directories (partitioned Parquet stores) are replaced as a whole, so removed partitions do not linger
+    if os.path.isdir(destination):
+        shutil.rmtree(destination)
+    if os.path.isdir(source):
+        shutil.copytree(source, destination)
+    else:
+        shutil.copyfile(source, destination)
+"""
+
+def copy_stage(name, copies):
+    """
+    Stage copying (source, destination) files or directories, for outputs of one step that the next step reads
+    from its own folder. The copies connect the two stages in the dependency graph.
+    """
+    paths = [path for copy in copies for path in copy]
+    return Stage(name, ".", [sys.executable, "-c", COPY_SCRIPT, *paths], [], [source for source, _ in copies], [destination for _, destination in copies])
+
+def _code_source(path):
+    if not path.endswith(".ipynb"):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    # Only the code cells matter, outputs and execution counts change on every run
+    with open(path, encoding="utf-8") as f:
+        nb = json.load(f)
+    return "\n".join("".join(cell["source"]) for cell in nb["cells"] if cell["cell_type"] == "code")
+
+class Pipeline:
+    """
+    Runs stages whose code or input content changed since their last successful run, independent stages concurrently.
+    Stage order follows from the paths: a stage depends on every stage that writes one of its inputs.
+    """
+    def __init__(self, stages, root, state_dir=".pipeline"):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.root = os.path.abspath(root)
+        self.state_dir = os.path.join(self.root, state_dir)
+        self.state_path = os.path.join(self.state_dir, "state.json")
+
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"{output} is written by both {producers[output]} and {stage.name}")
+                producers[output] = stage.name
+
+        self.dependencies = {stage.name: sorted({producers[i] for i in stage.inputs if i in producers}) for stage in stages}
+        self._check_cycles()
+
+        self.state = {"stages": {}, "hashes": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _check_cycles(self):
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage {name} depends on itself")
+            visiting.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+
+        for name in self.order:
+            visit(name)
+
+    def _path(self, path):
+        return os.path.join(self.root, path)
+
+    def file_hash(self, path):
+        """
+        SHA-256 of a file's content, or of every file below a directory. Hashes are reused while size and mtime are unchanged,
+        so large unchanged inputs (e.g. OSM extracts) are not read again on every run.
+        """
+        full_path = self._path(path)
+        if os.path.isdir(full_path):
+            h = hashlib.sha256()
+            for dir_path, dir_names, file_names in os.walk(full_path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    child = os.path.relpath(os.path.join(dir_path, file_name), self.root)
+                    h.update(child.encode("utf-8"))
+                    h.update(self.file_hash(child).encode("utf-8"))
+            return h.hexdigest()
+
+        if not os.path.exists(full_path):
+            return "missing"
+
+        stat = os.stat(full_path)
+        signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+        cached = self.state["hashes"].get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        h = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        self.state["hashes"][path] = [signature, h.hexdigest()]
+        return h.hexdigest()
+
+    def code_hash(self, stage):
+        """
+        SHA-256 of the stage's code files and of every common module they import, directly or through other common modules.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps(stage.command).encode("utf-8"))
+
+        pending, seen = list(stage.code), set()
+        while pending:
+            path = pending.pop(0)
+            if path in seen:
+                continue
+            seen.add(path)
+
+            source = _code_source(self._path(path))
+            h.update(path.encode("utf-8"))
+            h.update(source.encode("utf-8"))
+
+            for module in COMMON_IMPORT.findall(source):
+                module_path = os.path.join("common", f"{module}.py")
+                if os.path.exists(self._path(module_path)):
+                    pending.append(module_path)
+
+        return h.hexdigest()
+
+    def fingerprint(self, stage):
+        return {"code": self.code_hash(stage), "inputs": {path: self.file_hash(path) for path in stage.inputs}}
+
+    def stale_reason(self, stage, fingerprint):
+        """
+        Why the stage has to run, or None when its last successful run used the same code and inputs and its outputs exist.
+        """
+        previous = self.state["stages"].get(stage.name)
+        if previous is None:
+            return "never run"
+        if previous["code"] != fingerprint["code"]:
+            return "code changed"
+
+        changed = [path for path, digest in fingerprint["inputs"].items() if previous["inputs"].get(path) != digest]
+        if changed:
+            return f"inputs changed: {', '.join(changed)}"
+
+        missing = [path for path in stage.outputs if not os.path.exists(self._path(path))]
+        if missing:
+            return f"outputs missing: {', '.join(missing)}"
+
+        return None
+
+    def _save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _execute(self, stage):
+        """
+        Runs the stage's command with its output in a per-stage log file. Returns the exit code and duration.
+        """
+        log_dir = os.path.join(self.state_dir, "logs")
+        os.makedirs(log_dir, exist_ok=True)
+
+        command = list(stage.command)
+        if stage.code and stage.code[0].endswith(".ipynb"):
+            command += ["--output-dir", os.path.join(self.state_dir, "notebooks"), os.path.basename(stage.code[0])]
+
+        start = time.perf_counter()
+        with open(os.path.join(log_dir, f"{stage.name}.log"), "w", encoding="utf-8") as log:
+            returncode = subprocess.call(command, cwd=self._path(stage.cwd), stdout=log, stderr=subprocess.STDOUT)
+        return returncode, time.perf_counter() - start
+
+    def plan(self, force=()):
+        """
+        Stages that would run in declaration order with their reason, assuming every stage that runs changes its outputs.
+        """
+        planned = {}
+        for name in self._topological_order():
+            stage = self.stages[name]
+            reason = "forced" if name in force else self.stale_reason(stage, self.fingerprint(stage))
+            if reason is None:
+                upstream = [d for d in self.dependencies[name] if d in planned]
+                reason = f"upstream: {', '.join(upstream)}" if upstream else None
+            if reason is not None:
+                planned[name] = reason
+        return [(name, planned[name]) for name in self.order if name in planned]
+
+    def _topological_order(self):
+        ordered, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency)
+            ordered.append(name)
+
+        for name in self.order:
+            visit(name)
+        return ordered
+
+    def run(self, jobs=1, force=()):
+        """
+        Runs stale stages, up to jobs at a time. A stage starts once all its upstream stages have finished,
+        its staleness is decided then, on the inputs they just wrote. Dependents of a failed stage are blocked.
+        Returns the status of every stage.
+        """
+        status = {}
+        pending = list(self.order)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for name in list(pending):
+                    dependencies = self.dependencies[name]
+                    if any(status.get(d) in (STATUS_FAILED, STATUS_BLOCKED) for d in dependencies):
+                        status[name] = STATUS_BLOCKED
+                        pending.remove(name)
+                        print(f"[blocked] {name}")
+                        continue
+                    if not all(d in status for d in dependencies):
+                        continue
+
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    fingerprint = self.fingerprint(stage)
+                    reason = "forced" if name in force else self.stale_reason(stage, fingerprint)
+
+                    if reason is None:
+                        status[name] = STATUS_SKIPPED
+                        print(f"[skip] {name}: up to date")
+                        continue
+
+                    print(f"[run] {name}: {reason}")
+                    running[executor.submit(self._execute, stage)] = (name, fingerprint)
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, fingerprint = running.pop(future)
+                    returncode, seconds = future.result()
+
+                    if returncode == 0:
+                        status[name] = STATUS_DONE
+                        self.state["stages"][name] = fingerprint
+                        print(f"[done] {name} in {seconds:.1f}s")
+                    else:
+                        status[name] = STATUS_FAILED
+                        print(f"[failed] {name} with exit code {returncode}, see {os.path.join(self.state_dir, 'logs', name + '.log')}")
+
+                    self._save_state()
+
+        self._save_state()
+        return status
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import prophet
+from prophet import Prophet
+from prophet.serialize import model_to_json, model_from_json
+
+from common.model_cache import ModelCache, model_key
+
+# Daily station models of the forecast scripts
+STATION_PARAMS = {"yearly_seasonality": True, "weekly_seasonality": True, "daily_seasonality": False}
+
+def fit_prophet(df, params, cache=None, regressors=()):
+    """
+    Fits Prophet with the given constructor parameters and extra regressor columns on a "ds"/"y" frame.
+    With a ModelCache the fit is looked up by the content of df and the parameters first and stored after fitting.
+    """
+    columns = ["ds", "y"] + list(regressors)
+
+    if cache is not None:
+        key = model_key("prophet", prophet.__version__, [params, columns], *[df[col].to_numpy() for col in columns])
+        data = cache.get(key)
+        if data is not None:
+            return model_from_json(data.decode("utf-8"))
+
+    m = Prophet(**params)
+    for col in regressors:
+        m.add_regressor(col)
+    m.fit(df[columns])
+
+    if cache is not None:
+        cache.put(key, model_to_json(m).encode("utf-8"))
+
+    return m
+
+def station_job(stations, i, predict_future_days, cache_directory=None):
+    """
+    Job for fit_station from the i-th station of an expand_groups result, carrying only that station's series.
+    """
+    start, end = stations.offsets[i], stations.offsets[i + 1]
+    return stations.keys[i], stations.ds[start:end], stations.y[start:end], predict_future_days, cache_directory
+
+def fit_station(job):
+    """
+    Fits one station's daily series and returns ds, yhat, yhat_lower and yhat_upper for history and future days.
+    The uncertainty intervals are sampled with a seed taken from the station number,
+    so a station gets the same forecast no matter which process fits it, in which order or whether it came from the cache.
+    """
+    znr, ds, y, predict_future_days, cache_directory = job
+    cache = ModelCache(cache_directory) if cache_directory else None
+
+    m = fit_prophet(pd.DataFrame({"ds": ds, "y": y}), STATION_PARAMS, cache)
+    future = m.make_future_dataframe(periods=predict_future_days, freq="D")
+
+    np.random.seed(int(znr))
+    fc = m.predict(future)
+
+    return fc[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
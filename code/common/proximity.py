@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+RADII_M = [300, 500, 1000, 2000]
+CATEGORIES = ["U-Bahn", "Zug", "Bus", "Straßenbahn"]
+
+# WGS 84 ellipsoid
+_A = 6378137.0
+_E2 = 6.69437999014e-3
+
+def to_ecef(lat, lon):
+    """
+    Projects WGS 84 coordinates to earth-centered metric coordinates (EPSG:4978).
+    Straight-line distances there match geodesic distances to well below a millimeter at the radii used here.
+    """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    n = _A / np.sqrt(1 - _E2 * np.sin(lat) ** 2)
+
+    return np.column_stack([
+        n * np.cos(lat) * np.cos(lon),
+        n * np.cos(lat) * np.sin(lon),
+        n * (1 - _E2) * np.sin(lat),
+    ])
+
+def radius_join(stations, stops, max_radius_m):
+    """
+    Returns all (station row, stop row, distance in m) pairs within max_radius_m, ordered by station then stop.
+    stations need LATITUDE/LONGITUDE, stops need Latitude/Longitude columns.
+    """
+    station_tree = cKDTree(to_ecef(stations["LATITUDE"], stations["LONGITUDE"]))
+    stop_tree = cKDTree(to_ecef(stops["Latitude"], stops["Longitude"]))
+
+    pairs = station_tree.sparse_distance_matrix(stop_tree, max_radius_m, output_type="ndarray")
+    order = np.lexsort((pairs["j"], pairs["i"]))
+
+    return pd.DataFrame({
+        "station": pairs["i"][order],
+        "stop": pairs["j"][order],
+        "distance_m": pairs["v"][order],
+    })
+
+def proximity_features(stations, stops, pairs, radii_m=RADII_M, categories=CATEGORIES):
+    """
+    Per-station stop counts for every radius, in total and per Kategorie, e.g. "Bus_500m" and "Gesamt_500m".
+    """
+    category = pd.Categorical(stops["Kategorie"].to_numpy()[pairs["stop"]], categories=categories)
+    features = pd.DataFrame({"ZNR": stations["ZNR"].to_numpy()})
+
+    for radius in radii_m:
+        within = pairs["distance_m"].to_numpy() <= radius
+        station = pairs["station"].to_numpy()[within]
+
+        features[f"Gesamt_{radius}m"] = np.bincount(station, minlength=len(stations))
+        for code, name in enumerate(categories):
+            is_category = category.codes[within] == code
+            features[f"{name}_{radius}m"] = np.bincount(station[is_category], minlength=len(stations))
+
+    return features
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# Fixed column types of the raw dauerzaehlstellen.csv export
+RAW_DTYPES = {
+    "JAHR": "int16", "MONAT": "category", "ZNR": "int32", "ZNAME": "category", "STRTYP": "category", "STRNR": "category",
+    "RINAME": "category", "FZTYP": "category",
+    "DTVMS": "float32", "DTVMF": "float32", "DTVMO": "float32", "DTVDD": "float32", "DTVFR": "float32",
+    "DTVSA": "float32", "DTVSF": "float32", "TVMAX": "float32", "TVMAXT": "string",
+}
+
+# German month abbreviations to month numbers
+MONTH_NUMBERS = { "JAN.": 1, "JAN": 1, "FEB.": 2, "FEB": 2, "MÄRZ": 3, "APR.": 4, "APR": 4, "APRIL": 4, "MAI.": 5, "MAI": 5, "JUNI": 6, "JULI": 7, "AUG.": 8, "AUG": 8, "SEPT": 9, "SEP.": 9, "OKT.": 10, "OKT": 10, "NOV.": 11, "NOV": 11, "DEZ.": 12, "DEZ": 12 }
+
+COVID_START = np.datetime64("2020-02-01")
+COVID_END = np.datetime64("2022-01-30")
+
+# Rows with an unknown MONAT are rejected, the single-pass script before the chunked parser kept them with a NaT DATUM
+REASON_MONAT_UNKNOWN = "MONAT_UNKNOWN"
+REASON_DTVMS_MISSING = "DTVMS_MISSING"
+REASON_DTVMS_NEGATIVE = "DTVMS_NEGATIVE"
+REASON_TVMAXT_INVALID = "TVMAXT_INVALID"
+
+def read_raw_chunks(file_path, chunksize=100_000):
+    """
+    Streams the raw export in chunks of fixed-typed rows.
+    """
+    return pd.read_csv(file_path, delimiter=";", encoding="ISO-8859-1", dtype=RAW_DTYPES, chunksize=chunksize)
+
+def _months(year, month):
+    """
+    Year and month number as datetime64[M], computed as months since 1970-01.
+    """
+    return ((year.astype(np.int64) - 1970) * 12 + month - 1).astype("datetime64[M]")
+
+def month_of(chunk):
+    """
+    Month number per row from MONAT, looked up once per category instead of once per row. 0 if unknown.
+    """
+    categories = chunk["MONAT"].cat.categories
+    lookup = np.array([MONTH_NUMBERS.get(str(c).strip(), 0) for c in categories] + [0], dtype=np.int64)
+
+    # Missing values have code -1, which picks the trailing 0 of the lookup
+    return lookup[chunk["MONAT"].cat.codes.to_numpy()]
+
+def add_datum(chunk):
+    """
+    Adds DATUM (first day of the counting month) from JAHR and MONAT, NaT where the month is unknown.
+    """
+    month = month_of(chunk)
+    datum = _months(chunk["JAHR"].to_numpy(), month).astype("datetime64[ns]")
+    datum[month == 0] = np.datetime64("NaT")
+    chunk["DATUM"] = datum
+    return chunk
+
+def tvmaxt_dates(chunk):
+    """
+    Parses TVMAXT ("Mo, 03.01." or "Mo, 3.1.", with an optional "*" for estimated values) to a date in the counting year.
+    Day and month are read as integers from the parts around the first ".", NaT where that is not a valid date.
+    """
+    parts = chunk["TVMAXT"].str.rsplit(",", n=1).str[-1].str.split(".", n=2)
+    day = pd.to_numeric(parts.str[0].str.replace(r"\D", "", regex=True), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    month = pd.to_numeric(parts.str[1].str.replace(r"\D", "", regex=True), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    valid = ~np.isnan(day) & ~np.isnan(month)
+    day = np.where(valid, day, 0).astype(np.int64)
+    month = np.where(valid, month, 0).astype(np.int64)
+    valid &= (month >= 1) & (month <= 12) & (day >= 1)
+
+    months = _months(chunk["JAHR"].to_numpy(), np.where(valid, month, 1))
+    days_in_month = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    valid &= day <= days_in_month
+
+    dates = (months.astype("datetime64[D]") + np.where(valid, day - 1, 0)).astype("datetime64[ns]")
+    dates[~valid] = np.datetime64("NaT")
+
+    return dates
+
+def tvmaxt_missing(chunk):
+    """
+    Rows without a TVMAXT value, kept with NaT like the other rows of the month.
+    """
+    return chunk["TVMAXT"].fillna("").str.strip().eq("").to_numpy(dtype=bool)
+
+def _reject(reason, mask, code):
+    reason[mask & (reason == "")] = code
+
+def clean_chunk(chunk):
+    """
+    Turns a raw chunk (with DATUM) into processed rows and the rejected rows with a REASON code.
+    """
+    reason = np.full(len(chunk), "", dtype=object)
+    dtvms = chunk["DTVMS"].to_numpy(dtype=float, na_value=np.nan)
+
+    # The first matching reason is kept
+    _reject(reason, np.isnan(dtvms), REASON_DTVMS_MISSING)
+    _reject(reason, dtvms < 0, REASON_DTVMS_NEGATIVE)
+    _reject(reason, chunk["DATUM"].isna().to_numpy(), REASON_MONAT_UNKNOWN)
+
+    tvmaxt = tvmaxt_dates(chunk)
+    # A missing TVMAXT stays NaT, only values that are present but not a date are rejected
+    _reject(reason, np.isnat(tvmaxt) & ~tvmaxt_missing(chunk), REASON_TVMAXT_INVALID)
+
+    accepted = reason == ""
+    rejected = chunk[~accepted].assign(REASON=reason[~accepted])
+
+    df = chunk[accepted].copy()
+    df["TVMAXT"] = tvmaxt[accepted]
+
+    # Create ISTCOVID19
+    datum = df["DATUM"].to_numpy()
+    df["ISTCOVID19"] = ((datum >= COVID_START) & (datum <= COVID_END)).astype(np.int8)
+
+    # Drop the original JAHR and MONAT columns and move DATUM to the first position
+    df = df.drop(columns=["JAHR", "MONAT"])
+    df = df[["DATUM"] + [col for col in df.columns if col != "DATUM"]]
+
+    return df, rejected
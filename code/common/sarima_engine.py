@@ -0,0 +1,188 @@
+import time
+import warnings
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import DateOffset
+
+from common.sarimax_fit import fit_sarimax, converged
+from common.prophet_fit import fit_prophet
+
+EXOG_COLUMNS = [
+    "AUSPENDLER", "POP", "PKW_DENSITY",
+    "BICYCLE", "BIKESHARING", "BY_FOOT",
+    "CAR", "CARSHARING", "MOTORBIKE", "PUBLIC_TRANSPORT",
+    "ISTCOVID19",
+]
+ORDER = (1, 1, 1)
+SEASONAL_ORDER = (1, 1, 1, 12)
+MIN_HISTORY = 24
+PROPHET_PARAMS = {"yearly_seasonality": True, "weekly_seasonality": False, "daily_seasonality": False}
+
+WARM_POOLED = "pooled"
+WARM_PREVIOUS = "previous"
+
+# AR/MA coefficients do not depend on the scale of a station's counts, so they carry over between stations
+ARMA_PREFIXES = ("ar.", "ma.")
+
+# Optimizer attempts after the (optional) warm start, each one only when the previous did not converge
+COLD_ATTEMPTS = [("cold", "lbfgs", 50), ("powell", "powell", 500)]
+
+StationPanel = namedtuple("StationPanel", ["keys", "offsets", "dates", "y", "exog"])
+
+def build_panel(df, exog_columns=EXOG_COLUMNS):
+    """
+    Sorts the monthly panel by station and date and builds the exog matrix of all stations in one go.
+    The rows of station i are offsets[i]:offsets[i + 1].
+    """
+    df = df.sort_values(["ZNR", "DATE"], kind="stable")
+    keys, starts = np.unique(df["ZNR"].to_numpy(), return_index=True)
+
+    return StationPanel(
+        keys=keys,
+        offsets=np.append(starts, len(df)),
+        dates=df["DATE"].to_numpy().astype("datetime64[ns]"),
+        y=df["DTVMS"].to_numpy(dtype=float),
+        exog=df[exog_columns].fillna(0).to_numpy(dtype=float),
+    )
+
+def exog_at(dates, exog, at):
+    """
+    Exog rows of a station for the dates in at, zeros for dates the panel does not cover.
+    """
+    at = np.asarray(at, dtype="datetime64[ns]")
+    pos = np.minimum(np.searchsorted(dates, at), len(dates) - 1)
+    found = dates[pos] == at
+
+    rows = np.zeros((len(at), exog.shape[1]))
+    rows[found] = exog[pos[found]]
+    return rows
+
+def arma_params(res):
+    return {name: value for name, value in zip(res.model.param_names, np.asarray(res.params)) if name.startswith(ARMA_PREFIXES)}
+
+def pooled_params(panel, order=ORDER, seasonal_order=SEASONAL_ORDER):
+    """
+    AR/MA start values from one SARIMA fit on the average of all station series, each scaled to its own mean.
+    """
+    stations = np.repeat(panel.keys, np.diff(panel.offsets))
+    df = pd.DataFrame({"ZNR": stations, "DATE": panel.dates, "y": panel.y}).dropna(subset=["y"])
+    df["y"] = df["y"] / df.groupby("ZNR")["y"].transform("mean")
+    pooled = df.groupby("DATE")["y"].mean().asfreq("MS").dropna()
+
+    res, status = fit_with_fallback(pooled, order, seasonal_order)
+    return arma_params(res) if res is not None and converged(res) else {}
+
+def fit_with_fallback(endog, order, seasonal_order, exog=None, warm_params=None, cache=None):
+    """
+    Fits from the warm start first, then from cold starts with a longer and a derivative-free optimizer.
+    Returns the first converged results and the name of its attempt, the last non-converged results
+    with "not_converged", or (None, "failed") when every attempt raised.
+    """
+    attempts = ([("warm", "lbfgs", 50)] if warm_params else []) + COLD_ATTEMPTS
+    last = None
+
+    for name, method, maxiter in attempts:
+        try:
+            with warnings.catch_warnings():
+                # Non-converged fits are retried and reported instead of warned about per station
+                warnings.simplefilter("ignore")
+                res = fit_sarimax(endog, order, seasonal_order, exog=exog, cache=cache,
+                                  warm_params=warm_params if name == "warm" else None, method=method, maxiter=maxiter)
+        except (np.linalg.LinAlgError, ValueError):
+            continue
+
+        if converged(res):
+            return res, name
+        last = res
+
+    return (last, "not_converged") if last is not None else (None, "failed")
+
+def seasonal_naive(y, steps, season=12):
+    """
+    Repeats the last observed season, the forecast of stations whose every SARIMA fit failed.
+    """
+    last_season = y[-season:]
+    return last_season[np.arange(steps) % len(last_season)]
+
+def forecast_stations(df, forecast_end, order=ORDER, seasonal_order=SEASONAL_ORDER, exog_columns=EXOG_COLUMNS,
+                      warm_start=WARM_POOLED, cache=None, prophet=True):
+    """
+    Forecasts DTVMS of every station with at least MIN_HISTORY months from its last observed month to forecast_end
+    with SARIMAX (exog), SARIMA (no exog) and optionally Prophet with the exog columns as regressors.
+    warm_start is WARM_POOLED (start from a pooled fit), WARM_PREVIOUS (from the last converged station) or None.
+    Returns the forecasts (ZNR, DATE, DTVMS_fc_exog, DTVMS_fc_noex[, DTVMS_fc_prophet]) and a per-station fit report.
+    """
+    panel = build_panel(df, exog_columns)
+    warm = pooled_params(panel, order, seasonal_order) if warm_start == WARM_POOLED else {}
+
+    forecasts = []
+    report = []
+
+    def timed(znr, model, fit):
+        start = time.perf_counter()
+        res, status = fit()
+        report.append({"ZNR": znr, "model": model, "status": status, "seconds": time.perf_counter() - start})
+        return res, status
+
+    for i, znr in enumerate(panel.keys):
+        start, end = panel.offsets[i], panel.offsets[i + 1]
+        dates, y, exog = panel.dates[start:end], panel.y[start:end], panel.exog[start:end]
+
+        has_y = ~np.isnan(y)
+        if has_y.sum() < MIN_HISTORY:
+            continue
+
+        hist_dates = pd.DatetimeIndex(dates[has_y], name="DATE")
+        future_idx = pd.date_range(hist_dates.max() + DateOffset(months=1), forecast_end, freq="MS")
+        endog = pd.Series(y[has_y], index=hist_dates, name="DTVMS")
+        exog_future = exog_at(dates, exog, future_idx)
+        fc = pd.DataFrame({"ZNR": znr, "DATE": future_idx})
+
+        # 1) SARIMAX with exog
+        exog_hist = pd.DataFrame(exog[has_y], index=hist_dates, columns=exog_columns)
+        res_ex, status_ex = timed(znr, "sarimax", lambda: fit_with_fallback(endog, order, seasonal_order, exog_hist, warm, cache))
+        if res_ex is None:
+            fc["DTVMS_fc_exog"] = seasonal_naive(endog.to_numpy(), len(future_idx))
+        else:
+            fc["DTVMS_fc_exog"] = res_ex.get_forecast(steps=len(future_idx), exog=exog_future).predicted_mean.to_numpy()
+
+        # 2) SARIMA without exog
+        res_no, status_no = timed(znr, "sarima", lambda: fit_with_fallback(endog, order, seasonal_order, None, warm, cache))
+        if res_no is None:
+            fc["DTVMS_fc_noex"] = seasonal_naive(endog.to_numpy(), len(future_idx))
+        else:
+            fc["DTVMS_fc_noex"] = res_no.get_forecast(steps=len(future_idx)).predicted_mean.to_numpy()
+            if warm_start == WARM_PREVIOUS and converged(res_no):
+                warm = arma_params(res_no)
+
+        # 3) Prophet with the exog columns as extra regressors
+        if prophet:
+            df_prop = pd.DataFrame(exog[has_y], columns=exog_columns)
+            df_prop.insert(0, "ds", hist_dates)
+            df_prop.insert(1, "y", endog.to_numpy())
+
+            m, _ = timed(znr, "prophet", lambda: (fit_prophet(df_prop, PROPHET_PARAMS, cache=cache, regressors=exog_columns), "fitted"))
+            future = m.make_future_dataframe(periods=len(future_idx), freq="MS")
+            future[exog_columns] = exog_at(dates, exog, future["ds"])
+            fc["DTVMS_fc_prophet"] = m.predict(future)["yhat"].tail(len(future_idx)).to_numpy()
+
+        forecasts.append(fc)
+
+    return pd.concat(forecasts, ignore_index=True), pd.DataFrame(report, columns=["ZNR", "model", "status", "seconds"])
+
+def print_fit_report(report, slowest=5):
+    """
+    Fit time per model (count, total, mean, median, p95, max), fit outcomes and the slowest station fits.
+    """
+    seconds = report.groupby("model")["seconds"]
+    summary = seconds.describe(percentiles=[0.5, 0.95])[["count", "mean", "50%", "95%", "max"]]
+    summary.insert(1, "total", seconds.sum())
+    print("Fit time per model [s]:")
+    print(summary.round(3).to_string())
+
+    print("\nFit outcomes:")
+    print(pd.crosstab(report["model"], report["status"]).to_string())
+
+    print(f"\nSlowest {slowest} fits:")
+    print(report.nlargest(slowest, "seconds").round(3).to_string(index=False))
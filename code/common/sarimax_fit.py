@@ -0,0 +1,40 @@
+import pickle
+import statsmodels
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from common.model_cache import model_key
+
+def converged(res):
+    return bool(res.mle_retvals.get("converged", True)) if isinstance(res.mle_retvals, dict) else True
+
+def fit_sarimax(endog, order, seasonal_order, exog=None, cache=None, warm_params=None, method="lbfgs", maxiter=50):
+    """
+    Fits SARIMAX on a dated series, optionally with an exog frame, and returns the results object.
+    With a ModelCache the pickled results are looked up by the series, exog, orders and statsmodels version first,
+    only converged fits are stored.
+    warm_params maps parameter names (e.g. "ar.L1" from an earlier fit's param_names) to start values,
+    the remaining parameters start from the model's own estimates.
+    """
+    params = {"order": list(order), "seasonal_order": list(seasonal_order), "exog": None if exog is None else list(exog.columns)}
+
+    if cache is not None:
+        arrays = [endog.index.to_numpy(), endog.to_numpy()] + ([] if exog is None else [exog.to_numpy()])
+        key = model_key("statsmodels.SARIMAX", statsmodels.__version__, params, *arrays)
+        data = cache.get(key)
+        if data is not None:
+            return pickle.loads(data)
+
+    model = SARIMAX(endog, exog=exog, order=order, seasonal_order=seasonal_order, enforce_stationarity=False, enforce_invertibility=False)
+    start_params = None
+    if warm_params:
+        start_params = model.start_params.copy()
+        for i, name in enumerate(model.param_names):
+            if name in warm_params:
+                start_params[i] = warm_params[name]
+
+    res = model.fit(start_params=start_params, method=method, maxiter=maxiter, disp=False)
+
+    if cache is not None and converged(res):
+        cache.put(key, pickle.dumps(res, protocol=pickle.HIGHEST_PROTOCOL))
+
+    return res
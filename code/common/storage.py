@@ -0,0 +1,301 @@
+import os
+import shutil
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+MEASURE = pa.float32()
+
+# Explicit column types per dataset, columns that are not listed keep their inferred type
+SCHEMAS = {
+    "counts": {
+        "columns": {
+            "DATUM": pa.date32(), "ZNR": pa.int32(), "ZNAME": CATEGORY, "STRTYP": CATEGORY, "STRNR": CATEGORY,
+            "RINAME": CATEGORY, "FZTYP": CATEGORY,
+            "DTVMS": MEASURE, "DTVMF": MEASURE, "DTVMO": MEASURE, "DTVDD": MEASURE, "DTVFR": MEASURE,
+            "DTVSA": MEASURE, "DTVSF": MEASURE, "TVMAX": MEASURE,
+            "TVMAXT": pa.date32(), "ISTCOVID19": pa.int8(),
+        },
+        "partition_by": ["FZTYP"],
+        "year_of": "DATUM",
+        "sort_by": ["ZNR", "FZTYP", "RINAME", "DATUM"],
+    },
+    "locations": {
+        "columns": {
+            "ZNR": pa.int32(), "ZNAME": CATEGORY, "STRNR": CATEGORY, "RICHTUNG_1": CATEGORY, "RICHTUNG_2": CATEGORY,
+            "LONGITUDE": pa.float64(), "LATITUDE": pa.float64(), "BEZIRK_NAME": CATEGORY,
+        },
+        "sort_by": ["ZNR"],
+    },
+    "district_training": {
+        "columns": {"ds": pa.date32(), "y": MEASURE, "district_number": pa.int32()},
+    },
+    "district_forecast": {
+        "columns": {
+            "ds": pa.date32(), "yhat": MEASURE, "yhat_lower": MEASURE, "yhat_upper": MEASURE,
+            "district_number": pa.int32(), "znr": pa.int32(),
+        },
+        "year_of": "ds",
+        "sort_by": ["district_number", "znr", "ds"],
+    },
+    "panel": {
+        "columns": {
+            "ZNR": pa.int32(), "DATE": pa.date32(), "DTVMS": MEASURE, "ISTCOVID19": MEASURE, "BEZIRK": pa.int32(),
+            "AUSPENDLER": MEASURE, "POP": MEASURE, "PKW_DENSITY": MEASURE,
+            "BICYCLE": MEASURE, "BIKESHARING": MEASURE, "BY_FOOT": MEASURE, "CAR": MEASURE, "CARSHARING": MEASURE,
+            "MOTORBIKE": MEASURE, "PUBLIC_TRANSPORT": MEASURE,
+        },
+        "year_of": "DATE",
+        "sort_by": ["ZNR", "DATE"],
+    },
+    "dashboard": {
+        "columns": {
+            "DATE": pa.date32(), "ZNR": pa.int32(), "ZNAME": CATEGORY, "BEZIRK": pa.int32(), "BEZIRK_NAME": CATEGORY,
+            "LONGITUDE": pa.float64(), "LATITUDE": pa.float64(),
+            "DTVMS": MEASURE, "DTVMS_fc_exog": MEASURE, "DTVMS_fc_noex": MEASURE, "DTVMS_fc_prophet": MEASURE,
+            "DTVMS_full_exog": MEASURE, "DTVMS_full_noex": MEASURE, "DTVMS_full_prophet": MEASURE, "DTVMS_ensemble": MEASURE,
+            "ISTCOVID19": MEASURE, "POP": MEASURE, "AUSPENDLER": MEASURE, "PKW_DENSITY": MEASURE,
+            "CAR": MEASURE, "PUBLIC_TRANSPORT": MEASURE, "BY_FOOT": MEASURE, "BIKE": MEASURE,
+        },
+        "sort_by": ["DATE", "ZNR"],
+    },
+}
+
+YEAR_COLUMN = "YEAR"
+
+def parquet_path(file_path):
+    """
+    Location of the Parquet dataset belonging to a CSV path, e.g. data/x.csv -> data/x.parquet
+    """
+    return os.path.splitext(file_path)[0] + ".parquet"
+
+def feather_path(file_path):
+    return os.path.splitext(file_path)[0] + ".feather"
+
+def partition_columns(schema_name):
+    schema = SCHEMAS[schema_name]
+    return schema.get("partition_by", []) + ([YEAR_COLUMN] if "year_of" in schema else [])
+
+def to_arrow(df, schema_name):
+    """
+    Converts a frame to an Arrow table with the typed columns of the schema.
+    """
+    types = SCHEMAS[schema_name]["columns"]
+    arrays, fields = [], []
+
+    for col in df.columns:
+        if col in types:
+            array = pa.array(df[col], type=types[col], from_pandas=True)
+        else:
+            array = pa.array(df[col], from_pandas=True)
+        arrays.append(array)
+        fields.append(pa.field(col, array.type))
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+def _with_year(df, schema_name):
+    year_of = SCHEMAS[schema_name].get("year_of")
+    if year_of is None:
+        return df
+
+    return df.assign(**{YEAR_COLUMN: pd.to_datetime(df[year_of]).dt.year.astype("int32")})
+
+def write_dataset(df, file_path, schema_name, csv=True):
+    """
+    Writes df as typed Parquet next to file_path, partitioned by the schema's partition columns and year.
+    With csv=True the frame is also exported to file_path as before.
+    """
+    path = parquet_path(file_path)
+    table = to_arrow(_with_year(df, schema_name), schema_name)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+    partitions = partition_columns(schema_name)
+    if partitions:
+        pq.write_to_dataset(table, path, partition_cols=partitions)
+    else:
+        pq.write_table(table, path)
+
+    if csv:
+        df.to_csv(file_path, index=False, encoding="utf-8")
+
+def append_dataset(df, file_path, schema_name, part, csv=True):
+    """
+    Writes one chunk of a dataset that is produced chunk by chunk, part 0 replaces what was there before.
+    Memory use is bounded by the chunk size, readers see the parts as one dataset.
+    """
+    path = parquet_path(file_path)
+
+    if part == 0:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    table = to_arrow(_with_year(df, schema_name), schema_name)
+    pq.write_to_dataset(table, path, partition_cols=partition_columns(schema_name) or None, basename_template=f"part-{part}-{{i}}.parquet")
+
+    if csv:
+        df.to_csv(file_path, index=False, encoding="utf-8", mode="w" if part == 0 else "a", header=part == 0)
+
+def upsert_dataset(df, file_path, schema_name, keys, delete=None, csv=True):
+    """
+    Inserts or replaces the rows of df by keys and removes the keys listed in delete.
+    Only the partitions touched by df or delete are rewritten, the rest of the store stays as it is.
+    """
+    path = parquet_path(file_path)
+    partitions = partition_columns(schema_name)
+
+    if not os.path.exists(path) or not partitions:
+        touched = read_dataset(file_path, schema_name) if os.path.exists(path) else df.iloc[:0]
+    else:
+        changed = pd.concat([_with_year(df, schema_name), _with_year(delete, schema_name)] if delete is not None else [_with_year(df, schema_name)])
+        affected = changed[partitions].drop_duplicates()
+
+        # One AND group per affected partition, OR-ed together
+        filters = [[(col, "=", value) for col, value in zip(partitions, row)] for row in affected.itertuples(index=False)]
+        touched = _to_pandas(pq.read_table(path, filters=filters, partitioning="hive"), schema_name) if filters else df.iloc[:0]
+
+    replaced = pd.concat([df[keys], delete[keys]]) if delete is not None else df[keys]
+    key_index = pd.MultiIndex.from_frame(_normalize_keys(replaced))
+    kept = touched[~pd.MultiIndex.from_frame(_normalize_keys(touched[keys])).isin(key_index)]
+
+    combined = pd.concat([kept, df], ignore_index=True)
+    sort_by = [c for c in SCHEMAS[schema_name].get("sort_by", []) if c in combined.columns]
+    if sort_by:
+        combined = combined.sort_values(sort_by, kind="stable").reset_index(drop=True)
+
+    if not os.path.exists(path) or not partitions:
+        write_dataset(combined, file_path, schema_name, csv=csv)
+        return
+
+    # Replaces exactly the partitions present in the written table, emptied partitions are removed by hand
+    table = to_arrow(_with_year(combined, schema_name), schema_name)
+    pq.write_to_dataset(table, path, partition_cols=partitions, existing_data_behavior="delete_matching")
+
+    written = set(map(tuple, _with_year(combined, schema_name)[partitions].astype(str).drop_duplicates().itertuples(index=False)))
+    for row in affected.astype(str).itertuples(index=False):
+        if tuple(row) not in written:
+            shutil.rmtree(os.path.join(path, *[f"{col}={quote(value, safe='')}" for col, value in zip(partitions, row)]), ignore_errors=True)
+
+    if csv:
+        read_dataset(file_path, schema_name).to_csv(file_path, index=False, encoding="utf-8")
+
+def _normalize_keys(df):
+    """
+    Makes key columns comparable across stores: dates as datetime64[ns], categoricals as strings.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype("datetime64[ns]")
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str)
+
+    return df.reset_index(drop=True)
+
+def write_feather(df, file_path, schema_name):
+    """
+    Writes df as a single uncompressed Feather file that readers can memory-map.
+    """
+    feather.write_feather(to_arrow(df, schema_name), feather_path(file_path), compression="uncompressed")
+
+def read_feather(file_path, schema_name, columns=None):
+    """
+    Reads the Feather file written by write_feather memory-mapped. Rows keep the file's order, and null-free numeric
+    columns stay views of the mapped pages, which the OS shares between every process reading the same file.
+    """
+    table = feather.read_table(feather_path(file_path), columns=None if columns is None else list(columns), memory_map=True)
+    return table.to_pandas(date_as_object=False, split_blocks=True)
+
+def _to_pandas(table, schema_name):
+    if YEAR_COLUMN in table.column_names and YEAR_COLUMN not in SCHEMAS[schema_name]["columns"]:
+        table = table.drop_columns([YEAR_COLUMN])
+
+    df = table.to_pandas(date_as_object=False)
+
+    # Partition columns are appended at the end by the reader, restore the schema order
+    types = SCHEMAS[schema_name]["columns"]
+    df = df[[c for c in types if c in df.columns] + [c for c in df.columns if c not in types]]
+
+    sort_by = [c for c in SCHEMAS[schema_name].get("sort_by", []) if c in df.columns]
+    if sort_by:
+        df = df.sort_values(sort_by, kind="stable").reset_index(drop=True)
+
+    return df
+
+def _filter_csv(df, schema_name, filters):
+    ops = {
+        "=": lambda s, v: s == v, "==": lambda s, v: s == v, "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v, "<=": lambda s, v: s <= v, ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+    }
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if col == YEAR_COLUMN:
+            values = pd.to_datetime(df[SCHEMAS[schema_name]["year_of"]]).dt.year
+        else:
+            values = df[col]
+        mask &= ops[op](values, value)
+
+    return df[mask].reset_index(drop=True)
+
+def read_csv_typed(file_path, schema_name, columns=None):
+    """
+    Reads the CSV export with the schema's types applied, used when no Parquet dataset exists yet.
+    """
+    types = SCHEMAS[schema_name]["columns"]
+    dates = [c for c, t in types.items() if t == pa.date32() and (columns is None or c in columns)]
+
+    df = pd.read_csv(file_path, usecols=columns, parse_dates=dates)
+
+    for col in df.columns:
+        t = types.get(col)
+        if t is None or col in dates:
+            continue
+        if t == CATEGORY:
+            df[col] = df[col].astype("category")
+        elif pa.types.is_floating(t) or (pa.types.is_integer(t) and df[col].notna().all()):
+            df[col] = df[col].astype(t.to_pandas_dtype())
+
+    return df
+
+def read_dataset(file_path, schema_name, columns=None, filters=None):
+    """
+    Reads the dataset belonging to file_path, preferring the typed Parquet store over the CSV export.
+    columns limits the columns read, filters is a list of (column, op, value) tuples that prunes partitions and
+    row groups, e.g. [("FZTYP", "=", "Kfz"), ("YEAR", ">=", 2020)].
+    """
+    path = parquet_path(file_path)
+    columns = None if columns is None else list(columns)
+
+    if os.path.exists(path):
+        table = pq.read_table(path, columns=columns, filters=filters or None, partitioning="hive")
+
+        # Partition columns come back as plain partition keys, cast them back to the schema type
+        types = SCHEMAS[schema_name]["columns"]
+        for col in partition_columns(schema_name):
+            if col in table.column_names and col in types and table.schema.field(col).type != types[col]:
+                i = table.column_names.index(col)
+                table = table.set_column(i, col, table.column(col).cast(types[col]))
+
+        return _to_pandas(table, schema_name)
+
+    filters = filters or []
+    read_columns = columns
+    if columns is not None:
+        year_of = SCHEMAS[schema_name].get("year_of")
+        needed = [year_of if col == YEAR_COLUMN else col for col, _, _ in filters]
+        read_columns = columns + [c for c in needed if c not in columns]
+
+    df = read_csv_typed(file_path, schema_name, read_columns)
+    if filters:
+        df = _filter_csv(df, schema_name, filters)
+
+    return df if columns is None else df[columns]
@@ -0,0 +1,109 @@
+// Style and popup of the station markers, run in the browser for the dl.GeoJSON layer.
+// Features carry numbers only, station names and the explanation text come once through the layer's hideout.
+window.dashExtensions = Object.assign({}, window.dashExtensions, {
+    dashboard: {
+        pointToLayer: function (feature, latlng, context) {
+            const value = feature.properties.value || 0;
+            // Scale radius: base size + traffic contribution, with a max cap
+            const radius = Math.min(8 + value / 5000, 25);
+            if (feature.properties.cluster) {
+                // District aggregate, drawn a little larger than a station with the same value
+                return L.circleMarker(latlng, {radius: radius + 4, color: "#fd7e14", weight: 3, fill: true, fillOpacity: 0.5});
+            }
+            return L.circleMarker(latlng, {radius: radius, color: "#007bff", fill: true, fillOpacity: 0.7});
+        },
+
+        onEachFeature: function (feature, layer, context) {
+            const hideout = context.hideout;
+            const props = feature.properties;
+            const latlng = layer.getLatLng();
+            const value = props.value === null ? "n/a" : props.value.toFixed(0);
+            const escape = (text) => String(text).replace(/[&<>"']/g, (c) => "&#" + c.charCodeAt(0) + ";");
+
+            if (props.cluster) {
+                layer.bindTooltip(escape(hideout.districts[props.bezirk] || props.bezirk) + ": " + value + " (" + props.stations + " stations)");
+                // Zooming in shows the district's stations
+                layer.on("click", () => layer._map.setView(latlng, hideout.stationZoom));
+                return;
+            }
+
+            const station = hideout.stations[props.znr] || ["", ""];
+            // Popups are only built when opened
+            layer.bindPopup(() => (
+                "<div><strong>" + escape(station[0]) + "</strong><br>" +
+                "Traffic Volume: " + value + "<br>" +
+                "District Code: " + props.bezirk + "<br>" +
+                "District Name: " + escape(station[1]) + "<br>" +
+                "<a href=\"https://www.google.com/maps/search/?api=1&query=" + latlng.lat + "," + latlng.lng + "\" target=\"_blank\">View on Google Maps</a><br>" +
+                "<hr><p style=\"font-size: 0.8em\">" + escape(hideout.explanation) + "</p>" +
+                "<a href=\"/detail/" + props.znr + "\" onclick=\"return window.dashExtensions.dashboard.navigate(this.getAttribute('href'))\">Go to Details →</a></div>"
+            ));
+        },
+
+        // Client-side navigation like dcc.Link, so the app is not reloaded
+        navigate: function (href) {
+            window.history.pushState({}, "", href);
+            window.dispatchEvent(new CustomEvent("_dashprivate_pushstate"));
+            return false;
+        }
+    }
+});
+
+// Clientside version of the month callback, reads the bundle written by build_month_bundle.py
+// and picks stations or districts like month_index.visible_features.
+// current is the bundle version and URL matching the page's data, null when the server has none.
+// Without that bundle (or for a month it does not have) the month goes to the server through map-request,
+// and the current bundle is loaded for the next steps.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        showMonth: function (index, zoom, bounds, current) {
+            const noUpdate = window.dash_clientside.no_update;
+            const bundle = window.dashboardMonths;
+            const matches = !!current && !!bundle && bundle.version === current.version;
+            if (current && !matches) {
+                window.dash_clientside.dashboard.loadBundle(current);
+            }
+            const month = matches && Number.isInteger(index) ? bundle.months[index] : undefined;
+            if (!month) {
+                return [noUpdate, noUpdate, {index: index, zoom: zoom, bounds: bounds}];
+            }
+
+            const stations = bundle.stations;
+            const feature = (lon, lat, properties) => ({type: "Feature", geometry: {type: "Point", coordinates: [lon, lat]}, properties: properties});
+
+            const inView = (s) => !bounds || (stations.lat[s] >= bounds[0][0] && stations.lat[s] <= bounds[1][0] &&
+                                              stations.lon[s] >= bounds[0][1] && stations.lon[s] <= bounds[1][1]);
+            const visible = month.station.map((s, i) => i).filter((i) => inView(month.station[i]));
+
+            let features;
+            if (zoom !== null && zoom !== undefined && zoom >= bundle.station_zoom && visible.length <= bundle.max_station_markers) {
+                features = visible.map((i) => {
+                    const s = month.station[i];
+                    return feature(stations.lon[s], stations.lat[s], {znr: stations.znr[s], bezirk: stations.bezirk[s], value: month.value[i]});
+                });
+            } else {
+                const districts = bundle.districts;
+                features = month.district.map((d, i) => feature(districts.lon[d], districts.lat[d],
+                    {bezirk: districts.bezirk[d], value: month.district_value[i], stations: month.district_stations[i], cluster: true}));
+            }
+
+            const empty = month.station.length === 0;
+            const label = empty ? "No data available for: " + month.label : "Displaying data for: " + month.label;
+            // Change color if the date is in the forecast period
+            const color = !empty && month.year >= 2025 ? "red" : "black";
+            return [{type: "FeatureCollection", features: features}, {namespace: "dash_html_components", type: "Span", props: {children: label, style: {color: color}}}, noUpdate];
+        },
+
+        // Loads the bundle of the given version once, it replaces window.dashboardMonths when it arrives
+        loadBundle: function (current) {
+            const dashboard = window.dash_clientside.dashboard;
+            if (dashboard.loadingVersion === current.version) {
+                return;
+            }
+            dashboard.loadingVersion = current.version;
+            const script = document.createElement("script");
+            script.src = current.url + "?v=" + encodeURIComponent(current.version);
+            document.head.appendChild(script);
+        }
+    }
+});
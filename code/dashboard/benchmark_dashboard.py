@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.storage import read_dataset
+
+DEFAULT_DATA = "dashboard/forecasts_dashboard/traffic_dashboard_final.csv"
+
+CALLBACK_INDEX = "display_page /"
+CALLBACK_DETAIL = "display_page /detail"
+CALLBACK_MAP = "update_map_and_slider_label"
+
+class InProcessClient:
+    """
+    Calls the callback functions of the dashboard module directly, payload is the JSON Dash would send.
+    """
+    def __init__(self, data_path, detail_cache=True):
+        os.environ["DASHBOARD_DATA"] = data_path
+        import dashboard
+        from plotly.io.json import to_json_plotly
+
+        self.dashboard = dashboard
+        self.to_json = to_json_plotly
+        self.map_callback = True
+        if not detail_cache:
+            dashboard.detail_cache.max_entries = 0
+            dashboard.exog_cache.max_entries = 0
+
+    def call(self, callback, value):
+        if callback == CALLBACK_MAP:
+            result = self.dashboard.update_map_and_slider_label(value, 12, None)
+        else:
+            result = self.dashboard.display_page(value)
+        return len(self.to_json(result))
+
+class HttpClient:
+    """
+    Posts callback requests to a running dashboard the way the browser does.
+    """
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        with urllib.request.urlopen(f"{self.url}/_dash-dependencies") as response:
+            dependencies = json.load(response)
+
+        # The server side of the month callback, assets/map.js hands it months it has no bundle for
+        self.map_output = next(d["output"] for d in dependencies if any(i["id"] == "map-request" for i in d["inputs"]))
+        # The map callback is not served by the server while the index page comes with a month bundle
+        index_page = json.loads(self._post(self._page_body("/"))[1])
+        self.map_callback = _find_component(index_page, "month-bundle").get("data") is None
+
+    def _post(self, body):
+        request = urllib.request.Request(f"{self.url}/_dash-update-component", data=json.dumps(body).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            data = response.read()
+        return len(data), data
+
+    def _page_body(self, pathname):
+        return {
+            "output": "page-content.children",
+            "outputs": {"id": "page-content", "property": "children"},
+            "inputs": [{"id": "url", "property": "pathname", "value": pathname}],
+            "changedPropIds": ["url.pathname"], "state": [],
+        }
+
+    def call(self, callback, value):
+        if callback == CALLBACK_MAP:
+            # Outputs as listed in the dependency, "..id.prop...id.prop.."
+            outputs = [dict(zip(["id", "property"], output.rsplit(".", 1))) for output in self.map_output.strip(".").split("...")]
+            return self._post({
+                "output": self.map_output, "outputs": outputs,
+                # The map at its initial view, before any zoom or move
+                "inputs": [{"id": "map-request", "property": "data", "value": {"index": value, "zoom": 12, "bounds": None}}],
+                "changedPropIds": ["map-request.data"], "state": [],
+            })[0]
+        return self._post(self._page_body(value))[0]
+
+def _find_component(node, component_id):
+    """
+    Props of the component with the given id in a Dash JSON response, empty when there is none.
+    """
+    if isinstance(node, dict):
+        props = node.get("props")
+        if isinstance(props, dict) and props.get("id") == component_id:
+            return props
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return {}
+    for child in children:
+        found = _find_component(child, component_id)
+        if found:
+            return found
+    return {}
+
+def user_session(stations, n_months, detail_pages, map_callback, rng):
+    """
+    Requests of one simulated user: the index page, every slider position and detail_pages random stations.
+    """
+    requests = [(CALLBACK_INDEX, "/")]
+    if map_callback:
+        requests += [(CALLBACK_MAP, i) for i in range(n_months)]
+    requests += [(CALLBACK_DETAIL, f"/detail/{znr}") for znr in rng.sample(stations, min(detail_pages, len(stations)))]
+    return requests
+
+def run_users(client, sessions, users):
+    """
+    Runs every session on its own thread, at most users at a time. Returns (callback, seconds, bytes) per request
+    and the wall-clock time.
+    """
+    def run(session):
+        samples = []
+        for callback, value in session:
+            start = time.perf_counter()
+            size = client.call(callback, value)
+            samples.append((callback, time.perf_counter() - start, size))
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        samples = [sample for session in executor.map(run, sessions) for sample in session]
+    return samples, time.perf_counter() - start
+
+def summarize(samples, wall_seconds):
+    """
+    Requests, latency percentiles [ms], mean payload [bytes] and throughput [requests/s] per callback.
+    """
+    df = pd.DataFrame(samples, columns=["callback", "seconds", "bytes"])
+    rows = []
+    for callback, group in df.groupby("callback"):
+        ms = group["seconds"].to_numpy() * 1000
+        rows.append({
+            "callback": callback, "requests": len(group),
+            "p50_ms": np.percentile(ms, 50), "p95_ms": np.percentile(ms, 95), "p99_ms": np.percentile(ms, 99), "max_ms": ms.max(),
+            "mean_bytes": group["bytes"].mean(), "requests_per_s": len(group) / wall_seconds,
+        })
+    return pd.DataFrame(rows).set_index("callback")
+
+def regressions(summary, baseline, tolerance, max_p95_ms):
+    """
+    Callbacks whose p95 is above max_p95_ms, or more than tolerance above the baseline's p95.
+    """
+    failures = []
+    for callback, row in summary.iterrows():
+        if max_p95_ms is not None and row["p95_ms"] > max_p95_ms:
+            failures.append(f"{callback}: p95 {row['p95_ms']:.1f} ms above the limit of {max_p95_ms:.1f} ms")
+        if baseline is not None and callback in baseline:
+            limit = baseline[callback]["p95_ms"] * (1 + tolerance)
+            if row["p95_ms"] > limit:
+                failures.append(f"{callback}: p95 {row['p95_ms']:.1f} ms above the baseline's {baseline[callback]['p95_ms']:.1f} ms + {tolerance:.0%}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure dashboard callback latency with concurrent simulated users, in-process or against a running server. "
+                                                 "For a larger dataset write one with synthetic_data.py and pass it with --data (and DASHBOARD_DATA to the server).")
+    parser.add_argument("--url", help="dashboard to send the requests to over HTTP, e.g. http://127.0.0.1:8050; calls the callbacks in-process without it")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="dashboard dataset, must be the one the server loaded with --url")
+    parser.add_argument("--users", type=int, default=20, help="simulated users sending requests at the same time")
+    parser.add_argument("--sessions", type=int, default=None, help="user sessions in total, defaults to --users")
+    parser.add_argument("--detail-pages", type=int, default=10, help="station detail pages each user opens")
+    parser.add_argument("--warmup", type=int, default=1, help="sessions run one after another before measuring, 0 measures a cold start")
+    parser.add_argument("--no-detail-cache", action="store_true", help="render every detail page again (in-process only)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON, usable as a later --baseline")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase over the baseline")
+    parser.add_argument("--max-p95-ms", type=float, help="fail when any callback's p95 is above this")
+    args = parser.parse_args()
+
+    df = read_dataset(args.data, "dashboard", columns=["DATE", "ZNR"])
+    stations = sorted(df["ZNR"].unique().tolist())
+    n_months = pd.to_datetime(df["DATE"]).dt.to_period("M").nunique()
+
+    client = HttpClient(args.url) if args.url else InProcessClient(args.data, detail_cache=not args.no_detail_cache)
+    if not client.map_callback:
+        print("The month slider runs in the browser, update_map_and_slider_label is not measured")
+
+    rng = random.Random(args.seed)
+    n_sessions = args.sessions or args.users
+    sessions = [user_session(stations, n_months, args.detail_pages, client.map_callback, rng) for _ in range(args.warmup + n_sessions)]
+
+    if args.warmup:
+        run_users(client, sessions[:args.warmup], 1)
+
+    samples, wall_seconds = run_users(client, sessions[args.warmup:], args.users)
+    summary = summarize(samples, wall_seconds)
+
+    print(f"{len(samples)} requests of {n_sessions} sessions with {args.users} concurrent users on {len(stations)} stations and {n_months} months "
+          f"in {wall_seconds:.1f}s ({len(samples) / wall_seconds:,.1f} requests/s)")
+    print(summary.round(1).to_string())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary.to_dict(orient="index"), f, indent=1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    failures = regressions(summary, baseline, args.tolerance, args.max_p95_ms)
+    for failure in failures:
+        print(f"Regression: {failure}")
+    if failures:
+        sys.exit(1)
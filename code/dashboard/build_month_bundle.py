@@ -0,0 +1,19 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.storage import read_dataset
+from month_index import build_month_bundle, write_month_bundle, BUNDLE_PATH
+
+# Writes the per-month map data into the dashboard assets. While it matches the dashboard data,
+# the dashboard moves through the months in the browser without asking the server.
+df = read_dataset("dashboard/forecasts_dashboard/traffic_dashboard_final.csv", "dashboard")
+df["DATE"] = pd.to_datetime(df["DATE"])
+df = df.sort_values("DATE")
+
+unique_year_months = pd.PeriodIndex(df["DATE"].dt.to_period("M").unique()).sort_values()
+bundle = build_month_bundle(df, unique_year_months)
+write_month_bundle(bundle)
+
+print(f"Wrote {len(bundle['months'])} months of {len(bundle['stations']['znr'])} stations to {BUNDLE_PATH} ({os.path.getsize(BUNDLE_PATH) / 1024:,.0f} KiB)")
@@ -0,0 +1,17 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.storage import read_dataset, write_feather, feather_path
+
+# Writes the dashboard data as one uncompressed Feather file in the order the dashboard uses. Server workers
+# memory-map it instead of parsing the CSV each, and the dashboard ignores it once the dataset is newer.
+csv_path = "dashboard/forecasts_dashboard/traffic_dashboard_final.csv"
+
+df = read_dataset(csv_path, "dashboard")
+df["DATE"] = pd.to_datetime(df["DATE"])
+df = df.sort_values("DATE", kind="stable").reset_index(drop=True)
+write_feather(df, csv_path, "dashboard")
+
+print(f"Wrote {len(df)} rows to {feather_path(csv_path)} ({os.path.getsize(feather_path(csv_path)) / 1024 ** 2:,.1f} MiB)")
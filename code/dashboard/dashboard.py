@@ -1,5 +1,5 @@
 import dash
-from dash import html, dcc, Output, Input, State
+from dash import html, dcc, Output, Input, State, ClientsideFunction
 import dash_leaflet as dl
 import plotly.express as px
 import plotly.graph_objects as go
@@ -7,52 +7,41 @@ from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 import os # <-- Import the 'os' module
+import sys
+import hmac
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from month_index import visible_features, month_bundle_version, STATION_ZOOM
+from detail_cache import LRUCache, prewarm, DETAIL_CACHE_SIZE
+from snapshot import DataManager, build_snapshot, station_rows, daily_rows, DATA_PATH
+from downsample import line_trace, band_trace, relayout_range, scatter_class
+from metrics import dashboard_metrics, instrument_server, enable_timing_log
 
 # --- 1. Load and Preprocess Data ---
-# Initialize variables to hold data and slider configuration
-df = pd.DataFrame()
-# Initialize as a simple list. A PeriodIndex requires a frequency when empty.
-unique_year_months = []
-slider_marks = {}
+# The data and everything derived from it live in the data manager's current snapshot, see snapshot.py.
+# Every callback takes the snapshot once and uses only that one, a reload swaps in a new snapshot for later requests.
+# Using the specific hardcoded path as requested by the user, DASHBOARD_DATA points to another dataset (e.g. synthetic_data.py)
+csv_path = os.environ.get("DASHBOARD_DATA", DATA_PATH)
+data_manager = DataManager(csv_path)
 
-try:
-    # --- Hardcoded Path ---
-    # Using the specific hardcoded path as requested by the user.
-    csv_path = "dashboard/forecasts_dashboard/traffic_dashboard_final.csv"
-    
-    # Attempt to load the dataset using the full path
-    print(f"Attempting to load data from: {csv_path}")
-    df = pd.read_csv(csv_path)
-
-    # If loading is successful, proceed with all data processing
-    if not df.empty:
-        df['DATE'] = pd.to_datetime(df['DATE'])
-        df['YEAR'] = df['DATE'].dt.year
-        df = df.sort_values('DATE')
-
-        # Create the list of unique year-months for the slider
-        # The result of .unique() is a PeriodArray, which we convert to a sortable PeriodIndex.
-        unique_periods = df['DATE'].dt.to_period('M').unique()
-        unique_year_months = pd.PeriodIndex(unique_periods).sort_values()
-
-
-        # Create labels for the slider's marks, showing only years and hiding intermediate numbers
-        slider_marks = {}
-        for i, date in enumerate(unique_year_months):
-            # Handle the very last entry specifically to set its label correctly
-            if i == len(unique_year_months) - 1:
-                # If the last month is December, label this tick with the next year to signify the end of the range.
-                if date.month == 12:
-                    slider_marks[i] = str(date.year + 1)
-                else: # Otherwise, just use its own year.
-                    slider_marks[i] = date.strftime('%Y')
-            # Show the year for the first month of the year, or for the very first entry
-            elif date.month == 1 or i == 0:
-                slider_marks[i] = date.strftime('%Y')
-            else:
-                # For all other marks, provide an empty string to hide the default number
-                slider_marks[i] = ''
+# Rendered detail pages keyed by (ZNR, data version), exogenous panels by (BEZIRK, data version)
+detail_cache = LRUCache(DETAIL_CACHE_SIZE)
+exog_cache = LRUCache(DETAIL_CACHE_SIZE)
+# Set by --prewarm (or DASHBOARD_PREWARM=1 under gunicorn), pages are then also rendered after every reload
+prewarm_pages = False
 
+TRAFFIC_VOLUME_EXPLANATION = "Traffic Volume represents the average number of vehicles counted over a 24-hour period (Monday-Sunday)."
+
+# Timings, sizes and cache counters served on /metrics, DASHBOARD_TIMING_LOG=1 also logs every timing as a JSON line
+metrics = dashboard_metrics()
+if os.environ.get("DASHBOARD_TIMING_LOG") == "1":
+    enable_timing_log()
+
+try:
+    data_manager.current = build_snapshot(csv_path)
+    metrics.set("dashboard_dataset_load_seconds", data_manager.current.load_seconds)
+    metrics.set("dashboard_dataset_rows", len(data_manager.current.df))
 except FileNotFoundError:
     # This error will now be much more specific if it occurs.
     print(f"Error: Could not find 'traffic_dashboard_final.csv' at the expected path: {csv_path}")
@@ -61,9 +50,71 @@ except Exception as e:
     # Catch other potential errors during processing
     print(f"An error occurred during data processing: {e}")
 
+def client_months(data):
+    """
+    Whether the month bundle in the assets matches the data, checked on every index page so a bundle written
+    after the data was loaded is picked up.
+    """
+    return data.months_version is not None and month_bundle_version() == data.months_version
+
+def print_month_mode(data):
+    if client_months(data):
+        print("Month slider runs in the browser")
+    else:
+        print("Month slider runs on the server, run dashboard/build_month_bundle.py to move it to the browser")
+
+print_month_mode(data_manager.current)
+
+def swap_snapshot(old, new):
+    """
+    After a reload: drops the pages of the old version and renders the new ones again when pre-warming is on.
+    Pages of the old version that in-flight requests store afterwards are never asked for and age out of the LRU.
+    """
+    for cache in (detail_cache, exog_cache):
+        cache.retain(lambda key: key[1] == new.version)
+
+    metrics.set("dashboard_dataset_load_seconds", new.load_seconds)
+    metrics.set("dashboard_dataset_rows", len(new.df))
+    metrics.inc("dashboard_dataset_reloads_total")
+
+    print_month_mode(new)
+    if prewarm_pages:
+        prewarm_snapshot(new)
+
+data_manager.on_swap(swap_snapshot)
+
 
 # --- 2. Dash App Initialization ---
 app = dash.Dash(__name__, suppress_callback_exceptions=True, title="Vienna Car Traffic Forecast Dashboard")
+instrument_server(metrics, app.server)
+for cache_name, cache in [('detail', detail_cache), ('exog', exog_cache)]:
+    metrics.source("dashboard_cache_hits_total", lambda cache=cache: cache.hits, cache=cache_name)
+    metrics.source("dashboard_cache_misses_total", lambda cache=cache: cache.misses, cache=cache_name)
+    metrics.source("dashboard_cache_entries", lambda cache=cache: len(cache.entries), cache=cache_name)
+
+# POST /admin/reload reloads the data without a restart, only available when DASHBOARD_ADMIN_TOKEN is set
+# Under gunicorn it reaches only the worker that answers, there DASHBOARD_WATCH_SECONDS reloads every worker
+admin_token = os.environ.get("DASHBOARD_ADMIN_TOKEN")
+if admin_token:
+    from flask import jsonify, request
+
+    @app.server.route('/admin/reload', methods=['POST'])
+    def admin_reload():
+        """
+        Starts a reload in the background and answers right away, ?force=1 reloads even when no file changed.
+        The token is sent in the X-Admin-Token header.
+        """
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+            return jsonify(error="forbidden"), 403
+        if data_manager.reload_lock.locked():
+            return jsonify(status="running", version=data_manager.current.version), 409
+        force = request.args.get('force') == '1'
+        changed = data_manager.changed()
+        if not (force or changed):
+            return jsonify(status="unchanged", version=data_manager.current.version), 200
+        # Requests keep being served from the current version until the new one is swapped in
+        data_manager.reload_in_background(force=force)
+        return jsonify(status="started", version=data_manager.current.version), 202
 
 # --- 3. Main Application Layout ---
 app.layout = html.Div(style={'fontFamily': 'Arial, sans-serif', 'backgroundColor': '#f9f9f9', 'padding': '20px', 'position': 'relative'}, children=[
@@ -85,12 +136,14 @@ app.layout = html.Div(style={'fontFamily': 'Arial, sans-serif', 'backgroundColor
 
 # --- 4. Page Layouts (Functions) ---
 
+@metrics.timed('layout_index')
 def layout_index():
     """
     Generates the layout for the main page (map view).
     If the dataframe is empty (due to FileNotFoundError), it will display an error message.
     """
-    if df.empty:
+    data = data_manager.current
+    if data.df.empty:
         return html.Div([
             html.H3("Error: Data Could Not Be Loaded", style={'color': 'red', 'textAlign': 'center'}),
             html.P("Please check the console output for a 'FileNotFoundError'. Make sure that 'traffic_dashboard_final.csv' is in the same directory as your Python script.", style={'textAlign': 'center'})
@@ -102,41 +155,66 @@ def layout_index():
         dcc.Slider(
             id='month-slider',
             min=0,
-            max=len(unique_year_months) - 1,
+            max=len(data.unique_year_months) - 1,
             step=1,
-            value=unique_year_months.get_loc(pd.to_datetime('2024-12-01').to_period('M')) if pd.to_datetime('2024-12-01').to_period('M') in unique_year_months else 0, # Default to Dec 2024
-            marks=slider_marks,
+            value=data.unique_year_months.get_loc(pd.to_datetime('2024-12-01').to_period('M')) if pd.to_datetime('2024-12-01').to_period('M') in data.unique_year_months else 0, # Default to Dec 2024
+            marks=data.slider_marks,
             # Tooltip has been removed to hide the hover-over number
         ),
         html.Div(id='slider-output-container', style={'textAlign': 'center', 'marginTop': '10px', 'fontSize': '1.2em'}),
+        # Month bundle matching this page's data for assets/map.js, which hands a month to the server through
+        # map-request while the browser has no bundle of that version
+        dcc.Store(id='month-bundle', data={'version': data.months_version, 'url': app.get_asset_url('month_bundle.js')} if client_months(data) else None),
+        dcc.Store(id='map-request'),
         # Leaflet map to display the stations
         dl.Map(
+            id='map',
             center=[48.2082, 16.3738], zoom=12,
             children=[
                 dl.TileLayer(
                     url="https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png",
                     attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors &copy; <a href="https://carto.com/attributions">CARTO</a>'
                 ),
-                dl.LayerGroup(id='marker-layer')
+                # Markers and popups are drawn in the browser by assets/map.js, the callback only sends numbers
+                dl.GeoJSON(
+                    id='marker-layer',
+                    pointToLayer={'variable': 'dashExtensions.dashboard.pointToLayer'},
+                    onEachFeature={'variable': 'dashExtensions.dashboard.onEachFeature'},
+                    hideout={'stations': data.stations, 'districts': data.districts, 'stationZoom': STATION_ZOOM, 'explanation': TRAFFIC_VOLUME_EXPLANATION},
+                )
             ],
             style={'width': '100%', 'height': '60vh', 'marginTop': '20px', 'borderRadius': '8px'}
         ),
     ])
 
+@metrics.timed('layout_detail')
 def layout_detail(station_id):
     """
-    Generates the layout for the detail page of a specific counting station.
+    Detail page of a counting station, rendered once per station and data version and then served from the cache.
     """
     try:
         station_id = int(station_id)
-        # Filter the main dataframe for the selected station
-        station_data = df[df['ZNR'] == station_id].sort_values('DATE')
+    except ValueError:
+        # Not a station number, build_layout_detail renders the error page
+        return build_layout_detail(data_manager.current, station_id)
 
-        if station_data.empty:
-            return html.Div([
-                html.H3(f"No data found for station ID: {station_id}"),
-                dcc.Link("← Back to Map", href="/")
-            ])
+    data = data_manager.current
+    if station_id not in data.station_slices:
+        return html.Div([
+            html.H3(f"No data found for station ID: {station_id}"),
+            dcc.Link("← Back to Map", href="/")
+        ])
+
+    return detail_cache.get_or_build((station_id, data.version), lambda: build_layout_detail(data, station_id))
+
+def build_layout_detail(data, station_id):
+    """
+    Generates the layout for the detail page of a specific counting station from the snapshot data.
+    """
+    try:
+        station_id = int(station_id)
+        # Rows of the selected station, already sorted by date
+        station_data = station_rows(data, station_id)
 
         station_name = station_data['ZNAME'].iloc[0]
         bezirk_name = station_data['BEZIRK_NAME'].iloc[0]
@@ -151,7 +229,7 @@ def layout_detail(station_id):
 
         # 1. Historical Data (DTVMS)
         hist_data = station_data[station_data['DATE'].dt.year <= 2024]
-        fig_main.add_trace(go.Scatter(
+        fig_main.add_trace(scatter_class(len(hist_data))(
             x=hist_data['DATE'], y=hist_data['DTVMS'],
             mode='lines', name='Historical Traffic Volume',
             line=dict(color='#007bff', width=2.5)
@@ -166,7 +244,7 @@ def layout_detail(station_id):
             'DTVMS_full_prophet': ('Forecast (Prophet)', '#17a2b8', 1.5)
         }
         for col, (name, color, width) in forecast_models.items():
-            fig_main.add_trace(go.Scatter(
+            fig_main.add_trace(scatter_class(len(fc_data))(
                 x=fc_data['DATE'], y=fc_data[col],
                 mode='lines', name=name,
                 line=dict(color=color, width=width, dash='dot' if 'Ensemble' not in name else 'solid'),
@@ -202,71 +280,6 @@ def layout_detail(station_id):
         ], style={'fontSize': '0.9em', 'color': '#6c757d', 'textAlign': 'center', 'marginTop': '10px'})
 
 
-        # --- Exogenous Variables Plots ---
-        fig_exog = make_subplots(
-            rows=2, cols=2,
-            subplot_titles=(
-                "District Population Over Time", "District Commuter Rate (%)", 
-                "District Car Density Over Time", "Yearly Vienna Traffic Share (%)"
-            ),
-            specs=[[{'type': 'xy'}, {'type': 'xy'}], # Using 'xy' for line charts
-                   [{'type': 'xy'}, {'type': 'bar'}]]
-        )
-        
-        # Plot 1: Population Time Series
-        fig_exog.add_trace(go.Scatter(
-            x=station_data['DATE'], y=station_data['POP'], 
-            mode='lines', name='Population', line=dict(color='#636EFA')
-        ), row=1, col=1)
-
-        # Plot 2: Commuters Time Series
-        fig_exog.add_trace(go.Scatter(
-            x=station_data['DATE'], y=station_data['AUSPENDLER'], 
-            mode='lines', name='Commuter Rate', line=dict(color='#EF553B')
-        ), row=1, col=2)
-
-        # Plot 3: Car Density Time Series
-        fig_exog.add_trace(go.Scatter(
-            x=station_data['DATE'], y=station_data['PKW_DENSITY'], 
-            mode='lines', name='Car Density', line=dict(color='#00CC96')
-        ), row=2, col=1)
-
-        # Plot 4: Traffic Share (Yearly Stacked Bar Chart)
-        traffic_share_cols = ['CAR', 'PUBLIC_TRANSPORT', 'BY_FOOT', 'BIKE']
-        # Calculate yearly average for the traffic share percentages
-        yearly_share = station_data.groupby('YEAR')[traffic_share_cols].mean().reset_index()
-
-        for col, color in zip(traffic_share_cols, ['#636EFA', '#EF553B', '#00CC96', '#AB63FA']):
-            fig_exog.add_trace(go.Bar(
-                x=yearly_share['YEAR'], 
-                y=yearly_share[col], 
-                name=col.replace('_', ' ').title()
-            ), row=2, col=2)
-
-        fig_exog.update_layout(
-            barmode='stack', # Stack the bars for the traffic share
-            title=dict(text="Exogenous Factors Over Time and City-Wide Traffic Share", x=0.5),
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="top", y=-0.2, xanchor="center", x=0.5), # Legend moved further down
-            height=600,
-            template='plotly_white', # Set background to white
-            margin=dict(l=40, r=20, t=100, b=150) # Increased bottom margin for legend
-        )
-        # Add axis titles for clarity
-        fig_exog.update_xaxes(title_text="Date", row=1, col=1)
-        fig_exog.update_xaxes(title_text="Date", row=1, col=2)
-        fig_exog.update_xaxes(title_text="Date", row=2, col=1)
-        fig_exog.update_xaxes(title_text="Year", row=2, col=2)
-        fig_exog.update_yaxes(title_text="Population", row=1, col=1)
-        fig_exog.update_yaxes(title_text="Rate (%)", row=1, col=2)
-        fig_exog.update_yaxes(title_text="Cars per 1000", row=2, col=1)
-        fig_exog.update_yaxes(title_text="Share (%)", row=2, col=2)
-        
-        exog_disclaimer = html.P(
-            "Note: The data for the exogenous variables (Population, Commuters, Car Density) was forecasted from 2025 onwards using an ARIMA model.",
-            style={'fontSize': '0.9em', 'color': '#6c757d', 'textAlign': 'center', 'marginTop': '10px'}
-        )
-
         # Add vertical spacing
         station_info_style = {'textAlign': 'center', 'color': '#6c757d', 'marginBottom': '25px'}
         graph_style = {'marginBottom': '25px'}
@@ -282,14 +295,20 @@ def layout_detail(station_id):
                 html.P(f"Counter ZNR: {znr}", style=p_style),
                 html.A("View on Google Maps", href=gmaps_link, target="_blank", style={'color': '#5CACEE'}) # Lighter blue link
             ], style=station_info_style),
-            html.Div(dcc.Graph(figure=fig_main), style=graph_style),
+            # Figures as plain dicts, a cached page is sent without validating the figures again
+            html.Div(dcc.Graph(figure=fig_main.to_dict()), style=graph_style),
             disclaimer_text,
             html.Hr(style=hr_style),
-            html.Div(dcc.Graph(figure=fig_exog), style=graph_style),
-            exog_disclaimer
+            *layout_daily(data, station_id, graph_style, hr_style),
+            # The exogenous panel is loaded by load_exog_panel once the section is opened
+            dcc.Store(id='detail-bezirk', data=bezirk_nr),
+            dcc.Tabs(id='exog-tabs', value='hidden', children=[
+                dcc.Tab(label='Hide Exogenous Factors', value='hidden'),
+                dcc.Tab(label='Show Exogenous Factors', value='exog', children=dcc.Loading(html.Div(id='exog-panel'))),
+            ])
         ], style={'backgroundColor': 'white', 'padding': '20px', 'borderRadius': '8px', 'boxShadow': '0 4px 6px rgba(0,0,0,0.1)'})
 
-    except (ValueError, IndexError) as e:
+    except (ValueError, IndexError, KeyError) as e:
         return html.Div([
             html.H3("Error processing this station.", style={'color': 'red'}),
             html.P(f"Details: {e}"),
@@ -297,12 +316,151 @@ def layout_detail(station_id):
         ])
 
 
+def daily_figure(data, station_id, x_range=None):
+    """
+    Daily Prophet forecast with its interval of a station, downsampled to the visible x range.
+    """
+    station_daily = daily_rows(data, station_id)
+    x = station_daily['DATE'].to_numpy()
+
+    fig = go.Figure([
+        band_trace(x, station_daily['yhat_lower'], station_daily['yhat_upper'], x_range, name='Forecast Interval', fillcolor='rgba(23, 162, 184, 0.2)'),
+        line_trace(x, station_daily['yhat'], x_range, name='Daily Forecast (Prophet)', line=dict(color='#17a2b8', width=1.5)),
+    ])
+    fig.update_layout(
+        title=dict(text="Daily Car Traffic Forecast (Prophet)", x=0.5),
+        xaxis_title="Date",
+        yaxis_title="Vehicles per Day",
+        template='plotly_white',
+        margin=dict(l=20, r=20, t=40, b=20),
+        # Keeps the user's zoom when a finer figure for the window replaces this one
+        uirevision=station_id
+    )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+def layout_daily(data, station_id, graph_style, hr_style):
+    """
+    Daily forecast section of a detail page, empty for stations without a daily forecast.
+    """
+    if station_id not in data.daily_slices:
+        return []
+    return [
+        dcc.Store(id='detail-znr', data=station_id),
+        html.Div(dcc.Graph(id='daily-graph', figure=daily_figure(data, station_id).to_dict()), style=graph_style),
+        html.Hr(style=hr_style),
+    ]
+
+def build_exog_panel(data, bezirk_nr):
+    """
+    Exogenous factors of a district. They are the same for every station in it, so the rows of its first station are used.
+    """
+    district_data = station_rows(data, data.district_stations[bezirk_nr])
+
+    # --- Exogenous Variables Plots ---
+    fig_exog = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=(
+            "District Population Over Time", "District Commuter Rate (%)", 
+            "District Car Density Over Time", "Yearly Vienna Traffic Share (%)"
+        ),
+        specs=[[{'type': 'xy'}, {'type': 'xy'}], # Using 'xy' for line charts
+               [{'type': 'xy'}, {'type': 'bar'}]]
+    )
+    
+    # Plot 1: Population Time Series
+    fig_exog.add_trace(go.Scatter(
+        x=district_data['DATE'], y=district_data['POP'], 
+        mode='lines', name='Population', line=dict(color='#636EFA')
+    ), row=1, col=1)
+
+    # Plot 2: Commuters Time Series
+    fig_exog.add_trace(go.Scatter(
+        x=district_data['DATE'], y=district_data['AUSPENDLER'], 
+        mode='lines', name='Commuter Rate', line=dict(color='#EF553B')
+    ), row=1, col=2)
+
+    # Plot 3: Car Density Time Series
+    fig_exog.add_trace(go.Scatter(
+        x=district_data['DATE'], y=district_data['PKW_DENSITY'], 
+        mode='lines', name='Car Density', line=dict(color='#00CC96')
+    ), row=2, col=1)
+
+    # Plot 4: Traffic Share (Yearly Stacked Bar Chart)
+    traffic_share_cols = ['CAR', 'PUBLIC_TRANSPORT', 'BY_FOOT', 'BIKE']
+    # Calculate yearly average for the traffic share percentages
+    yearly_share = district_data.groupby('YEAR')[traffic_share_cols].mean().reset_index()
+
+    for col, color in zip(traffic_share_cols, ['#636EFA', '#EF553B', '#00CC96', '#AB63FA']):
+        fig_exog.add_trace(go.Bar(
+            x=yearly_share['YEAR'], 
+            y=yearly_share[col], 
+            name=col.replace('_', ' ').title()
+        ), row=2, col=2)
+
+    fig_exog.update_layout(
+        barmode='stack', # Stack the bars for the traffic share
+        title=dict(text="Exogenous Factors Over Time and City-Wide Traffic Share", x=0.5),
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="top", y=-0.2, xanchor="center", x=0.5), # Legend moved further down
+        height=600,
+        template='plotly_white', # Set background to white
+        margin=dict(l=40, r=20, t=100, b=150) # Increased bottom margin for legend
+    )
+    # Add axis titles for clarity
+    fig_exog.update_xaxes(title_text="Date", row=1, col=1)
+    fig_exog.update_xaxes(title_text="Date", row=1, col=2)
+    fig_exog.update_xaxes(title_text="Date", row=2, col=1)
+    fig_exog.update_xaxes(title_text="Year", row=2, col=2)
+    fig_exog.update_yaxes(title_text="Population", row=1, col=1)
+    fig_exog.update_yaxes(title_text="Rate (%)", row=1, col=2)
+    fig_exog.update_yaxes(title_text="Cars per 1000", row=2, col=1)
+    fig_exog.update_yaxes(title_text="Share (%)", row=2, col=2)
+    
+    exog_disclaimer = html.P(
+        "Note: The data for the exogenous variables (Population, Commuters, Car Density) was forecasted from 2025 onwards using an ARIMA model.",
+        style={'fontSize': '0.9em', 'color': '#6c757d', 'textAlign': 'center', 'marginTop': '10px'}
+    )
+
+    return html.Div([
+        html.Div(dcc.Graph(figure=fig_exog.to_dict()), style={'marginBottom': '25px'}),
+        exog_disclaimer
+    ])
+
+@metrics.timed('layout_exog_panel')
+def layout_exog_panel(bezirk_nr):
+    """
+    Exogenous panel of a district, rendered once per district and data version.
+    """
+    data = data_manager.current
+    if bezirk_nr not in data.district_stations:
+        return html.P("No exogenous data for this district in the current data version.")
+    return exog_cache.get_or_build((bezirk_nr, data.version), lambda: build_exog_panel(data, bezirk_nr))
+
+def prewarm_snapshot(data, background=True):
+    """
+    Renders every station detail page and district exogenous panel of the snapshot into the page caches.
+    Uses the untimed builders and stores without a lookup, so these renders stay out of the latency
+    histograms and cache counters on /metrics, which show visitor traffic only.
+    """
+    def render_detail(station_id):
+        detail_cache.put((station_id, data.version), build_layout_detail(data, station_id))
+
+    def render_exog_panel(bezirk_nr):
+        exog_cache.put((bezirk_nr, data.version), build_exog_panel(data, bezirk_nr))
+
+    prewarm(render_detail, list(data.station_slices), background)
+    prewarm(render_exog_panel, list(data.district_stations), background)
+
+
 # --- 5. Callbacks ---
 
 @app.callback(
     Output('page-content', 'children'),
     Input('url', 'pathname')
 )
+@metrics.timed('display_page')
 def display_page(pathname):
     """
     Router callback to switch between the main page and detail pages.
@@ -313,70 +471,105 @@ def display_page(pathname):
     return layout_index()
 
 
-@app.callback(
-    [Output('marker-layer', 'children'),
-     Output('slider-output-container', 'children')],
-    Input('month-slider', 'value')
-)
-def update_map_and_slider_label(selected_slider_index):
+@metrics.timed('update_map_and_slider_label')
+def update_map_and_slider_label(selected_slider_index, zoom=None, bounds=None):
     """
     Updates the map markers and the text below the slider based on the selected month.
+    The markers are the stations in view when zoomed in, one per district otherwise.
     """
-    if df.empty or len(unique_year_months) == 0:
-        return [], "Data not available"
+    data = data_manager.current
+    # A slider rendered before a reload can point past the months of the new data
+    if data.df.empty or not 0 <= selected_slider_index < len(data.unique_year_months):
+        return None, "Data not available"
 
     # Get the selected month-year period from the slider's index
-    selected_period = unique_year_months[selected_slider_index]
+    selected_period = data.unique_year_months[selected_slider_index]
     
-    # Filter the dataframe for that specific month
-    subset_df = df[df['DATE'].dt.to_period('M') == selected_period]
+    # Stations and districts of that month, prepared when the data was loaded
+    month = data.month_index[selected_slider_index]
+    features = visible_features(month, zoom, bounds)
 
-    if subset_df.empty:
+    if not len(month.znr):
         # Handle cases where a month might have no data for any station
         label_text = f"No data available for: {selected_period.strftime('%B %Y')}"
-        return [], html.Span(label_text, style={'color':'black'})
-
-    markers = []
-    traffic_volume_explanation = "Traffic Volume represents the average number of vehicles counted over a 24-hour period (Monday-Sunday)."
-    for _, row in subset_df.iterrows():
-        # Use ensemble value if available (for future dates), otherwise use historical DTVMS
-        display_value = row['DTVMS_ensemble'] if pd.notna(row['DTVMS_ensemble']) else row['DTVMS']
-        # FIX: Ensure the protocol is included for an absolute URL
-        gmaps_link = f"https://www.google.com/maps/search/?api=1&query={row['LATITUDE']},{row['LONGITUDE']}"
-        
-        # Create a popup for each marker
-        popup_content = html.Div([
-            html.Strong(row['ZNAME']), html.Br(),
-            f"Traffic Volume: {display_value:.0f}", html.Br(),
-            f"District Code: {int(row['BEZIRK'])}", html.Br(),
-            f"District Name: {row['BEZIRK_NAME']}", html.Br(),
-            html.A("View on Google Maps", href=gmaps_link, target="_blank"), html.Br(),
-            html.Hr(),
-            html.P(traffic_volume_explanation, style={'fontSize': '0.8em'}),
-            dcc.Link("Go to Details →", href=f"/detail/{row['ZNR']}")
-        ])
-        
-        # Create the circle marker. Radius is scaled by traffic volume.
-        markers.append(
-            dl.CircleMarker(
-                center=(row['LATITUDE'], row['LONGITUDE']),
-                # Scale radius: base size + traffic contribution, with a max cap
-                radius=min(8 + (display_value / 5000), 25),
-                color="#007bff",
-                fill=True,
-                fillOpacity=0.7,
-                children=[dl.Popup(popup_content)]
-            )
-        )
-    
+        return features, html.Span(label_text, style={'color':'black'})
+
     label_text = f"Displaying data for: {selected_period.strftime('%B %Y')}"
     # Change color if the date is in the forecast period
     text_color = 'red' if selected_period.year >= 2025 else 'black'
     
-    return markers, html.Span(label_text, style={'color':text_color})
+    return features, html.Span(label_text, style={'color':text_color})
+
+@app.callback(
+    Output('exog-panel', 'children'),
+    Input('exog-tabs', 'value'),
+    State('detail-bezirk', 'data')
+)
+@metrics.timed('load_exog_panel')
+def load_exog_panel(tab, bezirk_nr):
+    """
+    Fills the exogenous panel of a detail page the first time it is opened.
+    """
+    if tab != 'exog' or bezirk_nr is None:
+        return dash.no_update
+    return layout_exog_panel(bezirk_nr)
+
+@app.callback(
+    Output('daily-graph', 'figure'),
+    Input('daily-graph', 'relayoutData'),
+    State('detail-znr', 'data'),
+    prevent_initial_call=True
+)
+@metrics.timed('zoom_daily_graph')
+def zoom_daily_graph(relayout_data, station_id):
+    """
+    Replaces the daily forecast with a finer sample of the zoomed window, or the full range after a reset.
+    """
+    data = data_manager.current
+    # A page opened before a reload can show a station the new data no longer has
+    if not relayout_data or not any(key.startswith('xaxis.') for key in relayout_data) or station_id not in data.daily_slices:
+        return dash.no_update
+    return daily_figure(data, station_id, relayout_range(relayout_data)).to_dict()
+
+# The month is drawn by assets/map.js from the month bundle, no server round trip per slider step. Without a bundle
+# of the page's data version (none built, or the data was reloaded since) it asks the server through map-request.
+app.clientside_callback(
+    ClientsideFunction(namespace='dashboard', function_name='showMonth'),
+    [Output('marker-layer', 'data'), Output('slider-output-container', 'children'), Output('map-request', 'data')],
+    [Input('month-slider', 'value'), Input('map', 'zoom'), Input('map', 'bounds')],
+    State('month-bundle', 'data')
+)
+
+@app.callback(
+    Output('marker-layer', 'data', allow_duplicate=True),
+    Output('slider-output-container', 'children', allow_duplicate=True),
+    Input('map-request', 'data'),
+    prevent_initial_call=True
+)
+def show_month_on_server(request):
+    return update_map_and_slider_label(request['index'], request.get('zoom'), request.get('bounds'))
 
 
 # --- 6. Run the App ---
 if __name__ == '__main__':
-    # Setting debug=True allows for hot-reloading
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="Run the traffic forecast dashboard.")
+    parser.add_argument("--prewarm", action="store_true", help="render every station detail page and district exogenous panel in the background at startup")
+    parser.add_argument("--detail-cache-size", type=int, default=DETAIL_CACHE_SIZE, help="rendered detail pages kept in memory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--debug", action="store_true", help="Dash debug mode with hot-reloading")
+    parser.add_argument("--timing-log", action="store_true", help="log every callback and request timing as a JSON line")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="check the data files every SECONDS and reload them when they change")
+    args = parser.parse_args()
+
+    detail_cache.max_entries = args.detail_cache_size
+    if args.timing_log and os.environ.get("DASHBOARD_TIMING_LOG") != "1":
+        enable_timing_log()
+    if args.prewarm:
+        prewarm_pages = True
+        prewarm_snapshot(data_manager.current)
+    if args.watch:
+        data_manager.watch(args.watch)
+
+    # Development server, for several workers serve wsgi.py with gunicorn
+    app.run(host=args.host, port=args.port, debug=args.debug)
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+DETAIL_CACHE_SIZE = 256
+
+def dataset_version(*frames):
+    """
+    Content hash of the dashboard data (the monthly and the daily frame), part of every cache key so entries of
+    older data are never served. A change in any of the frames gives a new version.
+    """
+    h = hashlib.sha256()
+    for df in frames:
+        h.update(format(int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFFFFFFFFFF, "016x").encode("ascii"))
+    return h.hexdigest()[:16]
+
+def station_index(df):
+    """
+    Row positions of the data ordered by station and date, and the slice of that order holding every ZNR's rows.
+    A station's rows are df.take(order[slices[znr]]), taken without scanning or copying the whole frame.
+    """
+    znr = df["ZNR"].to_numpy()
+    order = np.lexsort((df["DATE"].to_numpy(), znr))
+    keys, starts = np.unique(znr[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    return order, {int(key): slice(int(start), int(end)) for key, start, end in zip(keys, starts, ends)}
+
+class LRUCache:
+    """
+    Thread-safe mapping that keeps the max_entries most recently used entries.
+    """
+    def __init__(self, max_entries=DETAIL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def retain(self, keep):
+        """
+        Drops every entry whose key keep returns False for, e.g. the pages of an old data version.
+        """
+        with self.lock:
+            for key in [key for key in self.entries if not keep(key)]:
+                del self.entries[key]
+
+    def get_or_build(self, key, build):
+        """
+        Cached value of key, built and stored on a miss. Concurrent misses may build twice, the last one is kept.
+        """
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+def prewarm(build, keys, background=True):
+    """
+    Calls build for every key, e.g. to render all detail pages before the first visitor asks for one.
+    Runs in a daemon thread when background is set, returns the thread or None.
+    """
+    def run():
+        for key in keys:
+            build(key)
+        print(f"Pre-rendered {len(keys)} pages with {build.__name__}")
+
+    if not background:
+        run()
+        return None
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Traces with more points are drawn with WebGL
+WEBGL_THRESHOLD = 1000
+# Points per trace sent for the visible window
+MAX_POINTS = 1500
+
+def scatter_class(n_points):
+    """
+    go.Scattergl for traces above WEBGL_THRESHOLD points, go.Scatter (SVG) otherwise.
+    """
+    return go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+
+def _as_float(x):
+    x = np.asarray(x)
+    return x.astype("datetime64[ns]").astype(np.int64).astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+
+def lttb(x, y, n_out):
+    """
+    Indices of n_out points chosen by Largest-Triangle-Three-Buckets, which keeps the visual shape of a line.
+    The first and last point are always kept, x has to be sorted and y free of NaN.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    edges[-1] = n - 1
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        # Point of the bucket spanning the largest triangle with the previous pick and the next bucket's average
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+
+    return idx
+
+def minmax(y, n_bins):
+    """
+    Indices of the minimum and maximum of y in n_bins equal-count bins, keeps the extremes of a band.
+    """
+    n = len(y)
+    if 2 * n_bins >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, n_bins + 1).astype(int)
+    lows = [start + int(np.argmin(y[start:end])) for start, end in zip(edges[:-1], edges[1:])]
+    highs = [start + int(np.argmax(y[start:end])) for start, end in zip(edges[:-1], edges[1:])]
+    return np.unique(lows + highs)
+
+def window(x, x_range):
+    """
+    Slice of the sorted x inside x_range (start, end), plus one point on each side so lines reach the edges.
+    """
+    if x_range is None:
+        return slice(0, len(x))
+    x = np.asarray(x)
+    start = max(np.searchsorted(x, np.datetime64(pd.Timestamp(x_range[0]), "ns"), side="left") - 1, 0)
+    end = min(np.searchsorted(x, np.datetime64(pd.Timestamp(x_range[1]), "ns"), side="right") + 1, len(x))
+    return slice(start, end)
+
+def relayout_range(relayout_data):
+    """
+    Visible x range from a graph's relayoutData, None when the graph is (back) at its full range.
+    """
+    if not relayout_data or relayout_data.get("xaxis.autorange"):
+        return None
+    if "xaxis.range[0]" in relayout_data:
+        return relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    if "xaxis.range" in relayout_data:
+        return tuple(relayout_data["xaxis.range"])
+    return None
+
+def line_trace(x, y, x_range=None, max_points=MAX_POINTS, **kwargs):
+    """
+    Line trace of the points in x_range, reduced with LTTB to max_points and drawn with WebGL above WEBGL_THRESHOLD points.
+    """
+    part = window(x, x_range)
+    x, y = np.asarray(x)[part], np.asarray(y, dtype=float)[part]
+    keep = ~np.isnan(y)
+    x, y = x[keep], y[keep]
+    idx = lttb(x, y, max_points)
+
+    return scatter_class(len(idx))(x=x[idx], y=y[idx], mode='lines', **kwargs)
+
+def band_trace(x, lower, upper, x_range=None, max_points=MAX_POINTS, **kwargs):
+    """
+    Filled band between lower and upper in x_range as one closed polygon, each edge reduced with min/max binning.
+    """
+    part = window(x, x_range)
+    x, lower, upper = np.asarray(x)[part], np.asarray(lower, dtype=float)[part], np.asarray(upper, dtype=float)[part]
+    low = minmax(lower, max_points // 4)
+    high = minmax(upper, max_points // 4)
+
+    return scatter_class(len(low) + len(high))(
+        x=np.concatenate([x[high], x[low][::-1]]), y=np.concatenate([upper[high], lower[low][::-1]]),
+        fill='toself', mode='lines', line=dict(width=0), hoverinfo='skip', **kwargs
+    )
@@ -0,0 +1,41 @@
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.parallel import iter_jobs
+from common.backtest import station_jobs, backtest_station, summarize, ensemble_weights, MODELS, RESULT_COLUMNS
+
+parser = argparse.ArgumentParser(description="Rolling-origin backtest of SARIMAX, SARIMA and Prophet per counting station.")
+parser.add_argument("--panel", default=os.path.abspath("merged_df.csv"), help="monthly station panel from combine_data.ipynb")
+parser.add_argument("--output", default=os.path.abspath("backtest_results.csv"), help="one row per station, origin and model")
+parser.add_argument("--origins", nargs="+", default=["2020-12-01", "2021-12-01", "2022-12-01"], help="last training month of each fold")
+parser.add_argument("--horizon", type=int, default=24, help="test months after each origin")
+parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS)
+parser.add_argument("--workers", type=int, default=os.cpu_count(), help="stations backtested in parallel")
+# Off by default, fit times of cached folds would be load times
+parser.add_argument("--model-cache", metavar="DIRECTORY", help="reuse and store model fits in this directory, cached folds are left out of the fit times")
+args = parser.parse_args()
+
+df = pd.read_csv(args.panel, parse_dates=["DATE"])
+model_cache = os.path.abspath(args.model_cache) if args.model_cache else None
+jobs = station_jobs(df, args.origins, args.horizon, args.models, cache_directory=model_cache)
+
+rows = []
+for done, (_, station_rows) in enumerate(iter_jobs(backtest_station, jobs, args.workers), start=1):
+    rows.extend(station_rows)
+    print(f"Backtested {done}/{len(jobs)} stations")
+
+# Completion order depends on the workers, the table does not
+results = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values(["ZNR", "origin", "model"], kind="stable")
+results.to_csv(args.output, index=False)
+
+print("\nMean error and time per model:")
+print(summarize(results).round(3).to_string())
+
+if len(args.models) > 1:
+    weights, dropped = ensemble_weights(results)
+    print("\nTrimmed inverse-RMSE ensemble weights:")
+    print(weights.round(6).to_string())
+    print(f"\nLeft out stations: {dropped}")
@@ -0,0 +1,31 @@
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.model_cache import ModelCache
+from common.sarima_engine import forecast_stations, print_fit_report, WARM_POOLED, WARM_PREVIOUS
+
+parser = argparse.ArgumentParser(description="Forecast DTVMS of every counting station with SARIMAX, SARIMA and Prophet.")
+parser.add_argument("--panel", default=os.path.abspath("merged_df.csv"), help="monthly station panel from combine_data.ipynb")
+parser.add_argument("--output", default=os.path.abspath("all_counters_forecasts.csv"))
+parser.add_argument("--report", default=os.path.abspath("fit_report.csv"), help="per-station fit status and time")
+parser.add_argument("--forecast-end", default="2030-12-01")
+parser.add_argument("--warm-start", choices=[WARM_POOLED, WARM_PREVIOUS, "none"], default=WARM_POOLED)
+parser.add_argument("--no-prophet", action="store_true")
+parser.add_argument("--no-model-cache", action="store_true")
+args = parser.parse_args()
+
+df = pd.read_csv(args.panel, parse_dates=["DATE"])
+model_cache = None if args.no_model_cache else ModelCache(os.path.abspath("model_cache"))
+
+out, fit_report = forecast_stations(
+    df, pd.to_datetime(args.forecast_end),
+    warm_start=None if args.warm_start == "none" else args.warm_start,
+    cache=model_cache, prophet=not args.no_prophet,
+)
+
+print_fit_report(fit_report)
+fit_report.to_csv(args.report, index=False)
+out.to_csv(args.output, index=False)
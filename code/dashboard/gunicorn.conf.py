@@ -0,0 +1,20 @@
+import os
+
+# gunicorn settings of the dashboard, run from the code folder: gunicorn -c dashboard/gunicorn.conf.py wsgi:server
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get("DASHBOARD_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("DASHBOARD_WORKERS", os.cpu_count() or 1))
+
+# The app and its data are loaded once in the master and the workers are forked from it. The memory-mapped dataset
+# is shared through the OS page cache. The indexes built from it are numpy arrays without Python objects per row,
+# so their copy-on-write pages stay shared as well. Rendered pages are Python objects that each worker copies as it
+# serves them, and after a reload (DASHBOARD_WATCH_SECONDS) every worker builds and holds its own copy of the new data.
+preload_app = True
+
+def post_fork(server, worker):
+    # Threads of the master do not survive the fork, every worker watches the data files itself
+    # and swaps in the new version on its own
+    watch_seconds = float(os.environ.get("DASHBOARD_WATCH_SECONDS", 0))
+    if watch_seconds > 0:
+        from dashboard import data_manager
+        data_manager.watch(watch_seconds)
@@ -0,0 +1,156 @@
+import json
+import time
+import logging
+import threading
+import functools
+from collections import defaultdict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 300_000, 1_000_000, 3_000_000, 10_000_000)
+
+timing_log = logging.getLogger("dashboard.timing")
+
+def enable_timing_log():
+    """
+    Writes one JSON line per timed call or request to stderr.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    timing_log.addHandler(handler)
+    timing_log.setLevel(logging.INFO)
+    timing_log.propagate = False
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+class Metrics:
+    """
+    Counters, gauges and histograms of one process in the Prometheus text format. Under gunicorn every worker
+    keeps its own, /metrics shows the worker that answers.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.kinds = {}
+        self.values = defaultdict(dict)
+        # Values read when scraped, e.g. cache counters kept elsewhere
+        self.sources = defaultdict(dict)
+
+    def describe(self, name, kind, help_text):
+        self.kinds[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(labels.items())
+        with self.lock:
+            self.values[name][key] = self.values[name].get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[name][tuple(labels.items())] = value
+
+    def source(self, name, read, **labels):
+        self.sources[name][tuple(labels.items())] = read
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, **labels):
+        key = tuple(labels.items())
+        with self.lock:
+            histogram = self.values[name].get(key)
+            if histogram is None:
+                histogram = self.values[name][key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def timed(self, function_name):
+        """
+        Decorator recording the duration of every call in dashboard_function_duration_seconds.
+        """
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - start
+                    self.observe("dashboard_function_duration_seconds", seconds, function=function_name)
+                    timing_log.info(json.dumps({"event": "function", "function": function_name, "seconds": round(seconds, 6)}))
+            return wrapper
+        return decorate
+
+    def render(self):
+        with self.lock:
+            values = {name: dict(series) for name, series in self.values.items()}
+        for name, series in self.sources.items():
+            values.setdefault(name, {}).update({key: read() for key, read in series.items()})
+
+        lines = []
+        for name in sorted(values):
+            kind, help_text = self.kinds.get(name, ("untyped", ""))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for key, value in values[name].items():
+                labels = dict(key)
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                    continue
+                for bound, count in zip(value["buckets"], value["counts"]):
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {value['count']}")
+                lines.append(f"{name}_sum{_labels(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+def instrument_server(metrics, server):
+    """
+    Times every request of the Flask server, with Dash callbacks labelled by their output, and adds the /metrics route.
+    """
+    from flask import Response, g, request
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record(response):
+        start = getattr(g, "metrics_start", None)
+        if start is None or request.path == "/metrics":
+            return response
+
+        seconds = time.perf_counter() - start
+        if request.path.endswith("/_dash-update-component"):
+            route, callback = "callback", (request.get_json(silent=True) or {}).get("output", "")
+        else:
+            route, callback = request.url_rule.rule if request.url_rule else "other", ""
+        size = response.content_length if response.content_length is not None else (0 if response.direct_passthrough else len(response.get_data()))
+
+        metrics.observe("dashboard_request_duration_seconds", seconds, route=route, callback=callback)
+        metrics.observe("dashboard_response_bytes", size, SIZE_BUCKETS, route=route, callback=callback)
+        metrics.inc("dashboard_requests_total", route=route, callback=callback, status=response.status_code)
+        timing_log.info(json.dumps({"event": "request", "route": route, "callback": callback, "status": response.status_code,
+                                    "seconds": round(seconds, 6), "bytes": size}))
+        return response
+
+    @server.route("/metrics")
+    def metrics_route():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def dashboard_metrics():
+    """
+    The metrics of the dashboard with their types and help texts.
+    """
+    metrics = Metrics()
+    metrics.describe("dashboard_function_duration_seconds", "histogram", "Duration of layout builders and callbacks.")
+    metrics.describe("dashboard_request_duration_seconds", "histogram", "Duration of HTTP requests, Dash callbacks labelled by output.")
+    metrics.describe("dashboard_response_bytes", "histogram", "Size of HTTP response bodies.")
+    metrics.describe("dashboard_requests_total", "counter", "HTTP requests by status.")
+    metrics.describe("dashboard_cache_hits_total", "counter", "Lookups answered from a page cache.")
+    metrics.describe("dashboard_cache_misses_total", "counter", "Lookups that had to render the page.")
+    metrics.describe("dashboard_cache_entries", "gauge", "Entries held by a page cache.")
+    metrics.describe("dashboard_dataset_load_seconds", "gauge", "Time to load and index the dashboard dataset.")
+    metrics.describe("dashboard_dataset_rows", "gauge", "Rows of the loaded dashboard dataset.")
+    metrics.describe("dashboard_dataset_reloads_total", "counter", "Dataset versions swapped in without a restart.")
+    return metrics
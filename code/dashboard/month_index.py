@@ -0,0 +1,206 @@
+import os
+import json
+import hashlib
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Per-month data for client-side scrubbing, served with the other assets
+BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "month_bundle.js")
+
+# Stations are drawn one by one from this zoom level on, below it the map shows one marker per district.
+# Past the zoom level more than MAX_STATION_MARKERS stations in view still fall back to the districts.
+STATION_ZOOM = 14
+MAX_STATION_MARKERS = 300
+
+# Marker columns of one month, views of arrays sorted by month. Features are only built for the markers in view.
+MonthIndex = namedtuple("MonthIndex", [
+    "znr", "bezirk", "lat", "lon", "value",
+    "district_bezirk", "district_lat", "district_lon", "district_value", "district_count",
+])
+
+def display_values(df):
+    """
+    Ensemble forecast where available (future months), historical DTVMS otherwise.
+    """
+    return df["DTVMS_ensemble"].where(df["DTVMS_ensemble"].notna(), df["DTVMS"]).to_numpy()
+
+def _value(v):
+    # JSON has no NaN, markers without a value get null
+    return None if np.isnan(v) else round(v, 1)
+
+def station_features(znr, bezirk, lat, lon, value):
+    """
+    GeoJSON point features of stations with numeric properties only, names come from the station lookup.
+    """
+    return [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}, "properties": {"znr": z, "bezirk": b, "value": _value(v)}}
+        for z, b, y, x, v in zip(znr.tolist(), bezirk.tolist(), lat.tolist(), lon.tolist(), value.tolist())
+    ]
+
+def district_features(bezirk, lat, lon, value, count):
+    """
+    GeoJSON point features of district aggregates, value is the mean over the district's stations.
+    """
+    return [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}, "properties": {"bezirk": b, "value": _value(v), "stations": c, "cluster": True}}
+        for b, y, x, v, c in zip(bezirk.tolist(), lat.tolist(), lon.tolist(), value.tolist(), count.tolist())
+    ]
+
+def feature_collection(features):
+    return {"type": "FeatureCollection", "features": features}
+
+def month_columns(df, periods):
+    """
+    Marker columns sorted by month and the row bounds of every month, month i is bounds[i]:bounds[i + 1].
+    """
+    codes = periods.get_indexer(df["DATE"].dt.to_period("M"))
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(periods) + 1))
+
+    znr = df["ZNR"].to_numpy()[order].astype(int)
+    bezirk = df["BEZIRK"].to_numpy()[order].astype(int)
+    lat = df["LATITUDE"].to_numpy(dtype=float)[order]
+    lon = df["LONGITUDE"].to_numpy(dtype=float)[order]
+    value = display_values(df).astype(float)[order]
+    return bounds, znr, bezirk, lat, lon, value
+
+def _district_columns(bounds, znr, bezirk, lat, lon, value):
+    """
+    Per month and district: the mean value and number of stations with a value, at the district's station centroid.
+    Rows are sorted by month, month i is district_bounds[i]:district_bounds[i + 1].
+    """
+    month = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    stations = pd.DataFrame({"ZNR": znr, "BEZIRK": bezirk, "LATITUDE": lat, "LONGITUDE": lon}).drop_duplicates("ZNR", keep="last")
+    centroids = stations.groupby("BEZIRK")[["LATITUDE", "LONGITUDE"]].mean()
+
+    districts = pd.DataFrame({"MONTH": month, "BEZIRK": bezirk, "VALUE": value}).groupby(["MONTH", "BEZIRK"])["VALUE"].agg(["mean", "count"]).reset_index()
+    districts = districts.join(centroids, on="BEZIRK")
+    district_bounds = np.searchsorted(districts["MONTH"].to_numpy(), np.arange(len(bounds)))
+
+    return (district_bounds, districts["BEZIRK"].to_numpy(), districts["LATITUDE"].to_numpy(), districts["LONGITUDE"].to_numpy(),
+            districts["mean"].to_numpy(dtype=float), districts["count"].to_numpy())
+
+def build_month_index(df, periods, columns=None):
+    """
+    MonthIndex of every month, position i holds the month periods[i]: its stations and district aggregates as slices of
+    numpy columns sorted by month. Built once so the map callback only looks up its month instead of scanning the whole
+    history, without a Python object per row that forked server workers would copy.
+    """
+    if columns is None:
+        columns = month_columns(df, periods)
+    bounds, znr, bezirk, lat, lon, value = columns
+    district_bounds, d_bezirk, d_lat, d_lon, d_value, d_count = _district_columns(*columns)
+
+    return [
+        MonthIndex(
+            znr[start:end], bezirk[start:end], lat[start:end], lon[start:end], value[start:end],
+            d_bezirk[d_start:d_end], d_lat[d_start:d_end], d_lon[d_start:d_end], d_value[d_start:d_end], d_count[d_start:d_end],
+        )
+        for start, end, d_start, d_end in zip(bounds[:-1], bounds[1:], district_bounds[:-1], district_bounds[1:])
+    ]
+
+def in_bounds(lat, lon, bounds):
+    """
+    Mask of the positions inside the map bounds [[south, west], [north, east]], all of them without bounds.
+    """
+    if not bounds:
+        return np.ones(len(lat), dtype=bool)
+    (south, west), (north, east) = bounds
+    return (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+
+def visible_features(month, zoom=None, bounds=None):
+    """
+    The month's stations inside the map bounds when zoomed in to STATION_ZOOM and at most MAX_STATION_MARKERS of them
+    are in view, the district aggregates otherwise (also without a zoom). Keeps the payload bounded whatever the
+    station count.
+    """
+    visible = in_bounds(month.lat, month.lon, bounds)
+    if zoom is not None and zoom >= STATION_ZOOM and visible.sum() <= MAX_STATION_MARKERS:
+        return feature_collection(station_features(month.znr[visible], month.bezirk[visible], month.lat[visible], month.lon[visible], month.value[visible]))
+    return feature_collection(district_features(month.district_bezirk, month.district_lat, month.district_lon, month.district_value, month.district_count))
+
+def months_version(columns, periods):
+    """
+    Version of the month data, hashed from the marker columns instead of the bundle's JSON, so the dashboard checks a
+    bundle against its data without building one. The same for the CSV, Parquet and Feather copies of the data.
+    """
+    bounds, znr, bezirk, lat, lon, value = columns
+    h = hashlib.sha256()
+    h.update(json.dumps([STATION_ZOOM, MAX_STATION_MARKERS, [str(period) for period in periods]]).encode("utf-8"))
+    # Values as the bundle rounds them, NaN (no value) as its own mask
+    value = np.round(value.astype(np.float64), 1)
+    missing = np.isnan(value)
+    for array in (bounds.astype(np.int64), znr.astype(np.int64), bezirk.astype(np.int64),
+                  lat.astype(np.float64), lon.astype(np.float64), np.where(missing, 0.0, value), missing):
+        h.update(np.ascontiguousarray(array).tobytes())
+    return h.hexdigest()
+
+def build_month_bundle(df, periods, columns=None):
+    """
+    Columnar data of every month for the browser: a station table (ZNR, district code, position), a district table
+    (code, centroid) and per month the station positions in that table with their values, plus the district aggregates.
+    Carries the months_version of the data it was built from.
+    """
+    if columns is None:
+        columns = month_columns(df, periods)
+    bounds, znr, bezirk, lat, lon, value = columns
+    district_bounds, d_bezirk, d_lat, d_lon, d_value, d_count = _district_columns(*columns)
+
+    # Station table from each station's latest row, as the popup names
+    keys, first_reversed = np.unique(znr[::-1], return_index=True)
+    last = len(znr) - 1 - first_reversed
+    station = np.searchsorted(keys, znr)
+    district_keys, district_first = np.unique(d_bezirk, return_index=True)
+
+    bundle = {
+        "station_zoom": STATION_ZOOM, "max_station_markers": MAX_STATION_MARKERS,
+        "stations": {"znr": keys.tolist(), "bezirk": bezirk[last].tolist(), "lat": lat[last].tolist(), "lon": lon[last].tolist()},
+        "districts": {"bezirk": district_keys.tolist(), "lat": d_lat[district_first].tolist(), "lon": d_lon[district_first].tolist()},
+        "months": [
+            {
+                "label": period.strftime("%B %Y"), "year": period.year,
+                "station": station[start:end].tolist(),
+                "value": [_value(v) for v in value[start:end].tolist()],
+                "district": np.searchsorted(district_keys, d_bezirk[d_start:d_end]).tolist(),
+                "district_value": [_value(v) for v in d_value[d_start:d_end].tolist()],
+                "district_stations": d_count[d_start:d_end].tolist(),
+            }
+            for period, start, end, d_start, d_end in zip(periods, bounds[:-1], bounds[1:], district_bounds[:-1], district_bounds[1:])
+        ],
+    }
+    bundle["version"] = months_version(columns, periods)
+    return bundle
+
+def write_month_bundle(bundle, path=BUNDLE_PATH):
+    """
+    Writes the bundle as a script Dash loads with the assets, the first line holds its version.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"// version: {bundle['version']}\n")
+        f.write(f"window.dashboardMonths = {json.dumps(bundle, separators=(',', ':'))};\n")
+    os.replace(tmp_path, path)
+
+def month_bundle_version(path=BUNDLE_PATH):
+    """
+    Version of the bundle in the assets, None when there is none.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.readline().strip().removeprefix("// version: ")
+
+def station_lookup(df):
+    """
+    Name and district name of every station by ZNR, sent to the browser once with the map layer.
+    """
+    stations = df.drop_duplicates("ZNR", keep="last")
+    return {str(int(znr)): [name, district] for znr, name, district in zip(stations["ZNR"], stations["ZNAME"], stations["BEZIRK_NAME"])}
+
+def district_lookup(df):
+    """
+    Name of every district by its code, for the popups of the district markers.
+    """
+    districts = df.drop_duplicates("BEZIRK", keep="last")
+    return {str(int(bezirk)): name for bezirk, name in zip(districts["BEZIRK"], districts["BEZIRK_NAME"])}
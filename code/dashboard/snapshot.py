@@ -0,0 +1,217 @@
+import os
+import time
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from common.storage import read_dataset, read_feather, feather_path, parquet_path
+from month_index import month_columns, months_version, build_month_index, station_lookup, district_lookup
+from detail_cache import dataset_version, station_index
+
+DATA_PATH = "dashboard/forecasts_dashboard/traffic_dashboard_final.csv"
+# Daily Prophet forecast of car traffic per station, shown on the detail pages when it exists
+DAILY_PATH = "prophet_forecasts/data/district_forecast_2032_Kfz.csv"
+
+# One loaded version of the dashboard data with everything derived from it, never changed once built. The per-row
+# indexes are numpy arrays over df rather than sorted copies or Python objects per row, so the pages of a snapshot
+# loaded before gunicorn forks stay shared between the workers.
+Snapshot = namedtuple("Snapshot", [
+    "version", "signature", "load_seconds",
+    "df", "unique_year_months", "slider_marks",
+    "month_index", "stations", "districts", "months_version",
+    "station_order", "station_slices", "district_stations",
+    "df_daily", "daily_order", "daily_slices",
+])
+
+def empty_snapshot():
+    return Snapshot(
+        version=None, signature=None, load_seconds=0.0,
+        df=pd.DataFrame(), unique_year_months=[], slider_marks={},
+        month_index=[], stations={}, districts={}, months_version=None,
+        station_order=np.array([], dtype=np.int64), station_slices={}, district_stations={},
+        df_daily=pd.DataFrame(), daily_order=np.array([], dtype=np.int64), daily_slices={},
+    )
+
+def station_rows(data, station_id):
+    """
+    Monthly rows of one station ordered by date.
+    """
+    return data.df.take(data.station_order[data.station_slices[station_id]])
+
+def daily_rows(data, station_id):
+    """
+    Daily forecast rows of one station ordered by date.
+    """
+    return data.df_daily.take(data.daily_order[data.daily_slices[station_id]])
+
+def dataset_paths(csv_path):
+    return [csv_path, parquet_path(csv_path), feather_path(csv_path)]
+
+def source_signature(paths):
+    """
+    Size and mtime of every file behind the given paths, directories included file by file. Changes whenever
+    one of them is rewritten.
+    """
+    signature = []
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(dir_path, name) for dir_path, _, names in os.walk(path) for name in names)
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            signature.append((file_path, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+def read_dashboard_data(csv_path):
+    """
+    Prefers the memory-mapped Feather copy of build_serving_data.py while it is newer than the dataset,
+    then the typed Parquet store when present, otherwise the CSV export.
+    """
+    serving_path = feather_path(csv_path)
+    sources = [path for path in (csv_path, parquet_path(csv_path)) if os.path.exists(path)]
+    if os.path.exists(serving_path) and all(os.path.getmtime(serving_path) >= os.path.getmtime(path) for path in sources):
+        return read_feather(csv_path, "dashboard")
+    return read_dataset(csv_path, "dashboard")
+
+def make_slider_marks(unique_year_months):
+    """
+    Labels for the slider's marks, showing only years and hiding intermediate numbers.
+    """
+    slider_marks = {}
+    for i, date in enumerate(unique_year_months):
+        # Handle the very last entry specifically to set its label correctly
+        if i == len(unique_year_months) - 1:
+            # If the last month is December, label this tick with the next year to signify the end of the range.
+            if date.month == 12:
+                slider_marks[i] = str(date.year + 1)
+            else: # Otherwise, just use its own year.
+                slider_marks[i] = date.strftime('%Y')
+        # Show the year for the first month of the year, or for the very first entry
+        elif date.month == 1 or i == 0:
+            slider_marks[i] = date.strftime('%Y')
+        else:
+            # For all other marks, provide an empty string to hide the default number
+            slider_marks[i] = ''
+    return slider_marks
+
+def build_snapshot(csv_path=DATA_PATH, daily_path=DAILY_PATH):
+    """
+    Loads the dashboard data and builds every index the pages and callbacks use.
+    Raises FileNotFoundError when the dataset does not exist.
+    """
+    start = time.perf_counter()
+    # Taken before reading, so files rewritten during the load are picked up by the next reload
+    signature = source_signature(dataset_paths(csv_path) + dataset_paths(daily_path))
+
+    print(f"Attempting to load data from: {csv_path}")
+    df = read_dashboard_data(csv_path)
+    if df.empty:
+        return empty_snapshot()._replace(signature=signature)
+
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    df['YEAR'] = df['DATE'].dt.year
+    # The serving copy is stored in this order already
+    if not df['DATE'].is_monotonic_increasing:
+        df = df.sort_values('DATE')
+
+    # The result of .unique() is a PeriodArray, which we convert to a sortable PeriodIndex.
+    unique_year_months = pd.PeriodIndex(df['DATE'].dt.to_period('M').unique()).sort_values()
+
+    # Row order by station with the slice of every ZNR, and the lowest station number of every district,
+    # whose rows carry the district's exogenous series
+    station_order, station_slices = station_index(df)
+    district_stations = {int(bezirk): int(znr) for bezirk, znr in df.groupby('BEZIRK')['ZNR'].min().items()}
+
+    # The browser moves through the months itself while the bundle written by build_month_bundle.py has this version
+    columns = month_columns(df, unique_year_months)
+
+    df_daily, daily_order, daily_slices = pd.DataFrame(), np.array([], dtype=np.int64), {}
+    try:
+        df_daily = read_dataset(daily_path, "district_forecast", columns=["ds", "znr", "yhat", "yhat_lower", "yhat_upper"])
+        df_daily = df_daily.rename(columns={"ds": "DATE", "znr": "ZNR"})
+        daily_order, daily_slices = station_index(df_daily)
+    except FileNotFoundError:
+        print(f"No daily forecast at {daily_path}, detail pages show the monthly series only")
+
+    return Snapshot(
+        version=dataset_version(df, df_daily), signature=signature, load_seconds=time.perf_counter() - start,
+        df=df, unique_year_months=unique_year_months, slider_marks=make_slider_marks(unique_year_months),
+        month_index=build_month_index(df, unique_year_months, columns), stations=station_lookup(df), districts=district_lookup(df),
+        months_version=months_version(columns, unique_year_months),
+        station_order=station_order, station_slices=station_slices, district_stations=district_stations,
+        df_daily=df_daily, daily_order=daily_order, daily_slices=daily_slices,
+    )
+
+class DataManager:
+    """
+    Holds the current Snapshot and replaces it with a newly built one when the files behind it change, or on request.
+    Building runs next to the requests being served. The swap is a single reference assignment, so a request that
+    already took the old snapshot finishes on it. Listeners are called with (old, new) after every swap.
+    """
+    def __init__(self, csv_path=DATA_PATH, daily_path=DAILY_PATH):
+        self.csv_path = csv_path
+        self.daily_path = daily_path
+        self.current = empty_snapshot()
+        self.listeners = []
+        self.reload_lock = threading.Lock()
+
+    def paths(self):
+        return dataset_paths(self.csv_path) + dataset_paths(self.daily_path)
+
+    def on_swap(self, listener):
+        self.listeners.append(listener)
+
+    def changed(self):
+        return source_signature(self.paths()) != self.current.signature
+
+    def reload(self, force=False):
+        """
+        Builds a new snapshot and swaps it in when the files changed since the current one was loaded, or always with force.
+        Returns True after a swap, False when nothing changed or the build failed (the current snapshot stays),
+        and None when another reload is already running.
+        """
+        if not self.reload_lock.acquire(blocking=False):
+            return None
+        try:
+            if not force and not self.changed():
+                return False
+            try:
+                snapshot = build_snapshot(self.csv_path, self.daily_path)
+            except Exception as e:
+                print(f"Reload failed, keeping data version {self.current.version}: {e}")
+                return False
+
+            old, self.current = self.current, snapshot
+            print(f"Data version {old.version} replaced by {snapshot.version} ({snapshot.load_seconds:.1f}s to build)")
+            for listener in self.listeners:
+                listener(old, snapshot)
+            return True
+        finally:
+            self.reload_lock.release()
+
+    def reload_in_background(self, force=False):
+        thread = threading.Thread(target=self.reload, kwargs={"force": force}, name="reload", daemon=True)
+        thread.start()
+        return thread
+
+    def watch(self, interval):
+        """
+        Checks the files every interval seconds and reloads once a change has stayed the same for one interval,
+        so outputs the pipeline is still writing are not loaded half-way.
+        """
+        def run():
+            previous = None
+            while True:
+                time.sleep(interval)
+                signature = source_signature(self.paths())
+                if signature != self.current.signature and signature == previous:
+                    self.reload()
+                previous = signature
+
+        thread = threading.Thread(target=run, name="watch", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,58 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.storage import read_dataset, write_dataset
+
+VALUE_COLUMNS = [
+    "DTVMS", "DTVMS_fc_exog", "DTVMS_fc_noex", "DTVMS_fc_prophet",
+    "DTVMS_full_exog", "DTVMS_full_noex", "DTVMS_full_prophet", "DTVMS_ensemble",
+]
+
+def synthetic_dashboard_data(df, station_factor=10, month_factor=10, seed=0):
+    """
+    Scales the dashboard data up for load tests. The series are repeated month_factor times back in time, and every
+    station is copied station_factor times with a new ZNR, a position moved by a few hundred metres and its traffic
+    values scaled by a random factor. Copy 0 is the original data.
+    """
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    df["DATE"] = pd.to_datetime(df["DATE"])
+
+    months = df["DATE"].dt.to_period("M")
+    span = months.max().ordinal - months.min().ordinal + 1
+    df = pd.concat([df.assign(DATE=(months - i * span).dt.to_timestamp()) for i in range(month_factor)], ignore_index=True)
+
+    stations = df["ZNR"].unique()
+    znr_step = 10 ** len(str(int(stations.max())))
+    copies = []
+    for i in range(station_factor):
+        copy = df.copy()
+        if i > 0:
+            shift = pd.DataFrame(rng.normal(0, 0.004, size=(len(stations), 2)), index=stations, columns=["LATITUDE", "LONGITUDE"])
+            scale = pd.Series(rng.uniform(0.7, 1.3, size=len(stations)), index=stations)
+            copy["LATITUDE"] += copy["ZNR"].map(shift["LATITUDE"])
+            copy["LONGITUDE"] += copy["ZNR"].map(shift["LONGITUDE"])
+            copy[VALUE_COLUMNS] = copy[VALUE_COLUMNS].mul(copy["ZNR"].map(scale), axis=0)
+            copy["ZNAME"] = copy["ZNAME"].astype(str) + f" ({i})"
+            copy["ZNR"] = copy["ZNR"] + i * znr_step
+        copies.append(copy)
+
+    return pd.concat(copies, ignore_index=True).sort_values(["DATE", "ZNR"], kind="stable").reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a scaled-up copy of the dashboard data, load it with DASHBOARD_DATA=<output>.")
+    parser.add_argument("--input", default="dashboard/forecasts_dashboard/traffic_dashboard_final.csv")
+    parser.add_argument("--output", default="dashboard/forecasts_dashboard/synthetic_dashboard.csv")
+    parser.add_argument("--stations", type=int, default=10, help="copies of every station")
+    parser.add_argument("--months", type=int, default=10, help="repetitions of the time range")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_dashboard_data(read_dataset(args.input, "dashboard"), args.stations, args.months, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_dataset(df, args.output, "dashboard")
+    print(f"Wrote {len(df)} rows, {df['ZNR'].nunique()} stations and {df['DATE'].dt.to_period('M').nunique()} months to {args.output}")
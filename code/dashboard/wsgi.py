@@ -0,0 +1,19 @@
+import os
+import sys
+
+# WSGI entry point for serving the dashboard with several worker processes, from the code folder:
+#   python dashboard/build_serving_data.py
+#   gunicorn -c dashboard/gunicorn.conf.py wsgi:server
+# Debug mode and hot-reloading stay off here, they are only available through dashboard.py --debug.
+# DASHBOARD_WATCH_SECONDS=<n> makes every worker reload the data when its files change (started in gunicorn.conf.py).
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import dashboard
+from dashboard import app, data_manager, prewarm_snapshot
+
+# Pages rendered before the workers fork are inherited by all of them (each worker copies the ones it serves),
+# after a reload every worker renders its own
+if os.environ.get("DASHBOARD_PREWARM") == "1":
+    prewarm_snapshot(data_manager.current, background=False)
+    dashboard.prewarm_pages = True
+
+server = app.server
@@ -1,35 +1,130 @@
 import os
+import sys
+import time
+import argparse
+import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.raw_counts import read_raw_chunks, add_datum, clean_chunk
+from common.storage import append_dataset, upsert_dataset, parquet_path
+
+parser = argparse.ArgumentParser(description="Prepare the monthly counting-station data.")
+parser.add_argument("--incremental", action="store_true", help="only parse raw rows that are new or changed since the last run")
+parser.add_argument("--chunksize", type=int, default=100_000, help="raw rows per chunk, bounds peak memory")
+args = parser.parse_args()
+
 file_path = os.path.abspath("data/raw/dauerzaehlstellen.csv")
 file_path_cleaned = os.path.abspath("data/dauerzaehlstellen_data.csv")
+file_path_rejected = os.path.abspath("data/dauerzaehlstellen_rejected.csv")
+file_path_watermark = os.path.abspath("data/dauerzaehlstellen_data_watermark.parquet")
+file_path_changed = os.path.abspath("data/dauerzaehlstellen_changed_stations.csv")
+
+key_columns = ["ZNR", "FZTYP", "RINAME", "DATUM"]
+
+def watermark(chunk):
+    # Processed keys with a hash of their raw row, so changed rows can be told apart from unchanged ones
+    df = chunk[key_columns].copy()
+    df["FZTYP"] = df["FZTYP"].astype(str)
+    df["RINAME"] = df["RINAME"].astype(str)
+    df["ROW_HASH"] = pd.util.hash_pandas_object(chunk.drop(columns=["DATUM"]), index=False).to_numpy()
+    return df
+
+def key_hashes(df_watermark):
+    # One entry per key: the wrapping sum of its row hashes and its row count, so duplicate raw rows anywhere in the
+    # export count towards the same key. Rows without a month get one entry per station, vehicle type and direction
+    # with a NaT DATUM, so they are parsed again only when they change.
+    return (df_watermark.groupby(key_columns, observed=True, dropna=False)["ROW_HASH"]
+            .agg(KEY_HASH="sum", ROWS="size").reset_index())
+
+def add_key_hashes(df_keys, df_chunk_keys):
+    # Running per-key sums over the chunks read so far, so only one row per key is held and not every chunk's rows
+    if df_keys is None:
+        return df_chunk_keys
+    return (pd.concat([df_keys, df_chunk_keys], ignore_index=True)
+            .groupby(key_columns, observed=True, dropna=False)[["KEY_HASH", "ROWS"]].sum().reset_index())
+
+def key_ids(keys):
+    # One hash per key, NaT months included, to pick the raw rows of a set of keys
+    keys = keys.astype({"ZNR": "int64", "FZTYP": str, "RINAME": str, "DATUM": "datetime64[ns]"})
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def write_rejected(df_rejected, part):
+    # Rows that did not make it into the processed data, with the reason code in REASON
+    df_rejected.to_csv(file_path_rejected, index=False, encoding="utf-8", mode="w" if part == 0 else "a", header=part == 0)
+
+incremental = args.incremental and os.path.exists(file_path_watermark) and os.path.exists(parquet_path(file_path_cleaned))
+df_previous = pd.read_parquet(file_path_watermark) if incremental else None
+if incremental and "KEY_HASH" not in df_previous.columns:
+    print("Watermark of an older version, running a full parse")
+    incremental = False
+
+df_keys = None
+cleaned_rows = []
+rejected_keys = []
+changed_stations = set()
+n_rows = n_parsed = n_rejected = 0
+start = time.perf_counter()
+
+def parse(chunk, part):
+    global n_parsed, n_rejected
+    df_cleaned, df_rejected = clean_chunk(chunk)
+    write_rejected(df_rejected, part)
+    n_parsed += len(chunk)
+    n_rejected += len(df_rejected)
+    # Rejected rows only change the store when their key was stored before, those stations are added with the deletes
+    changed_stations.update(df_cleaned["ZNR"].unique().tolist())
+
+    if incremental:
+        cleaned_rows.append(df_cleaned)
+        # Rows without a month never reach the store, so only dated keys are removed
+        rejected_keys.append(df_rejected.loc[df_rejected["DATUM"].notna(), key_columns])
+    else:
+        # Typed Parquet partitioned by vehicle type and year plus the CSV export, written chunk by chunk
+        append_dataset(df_cleaned, file_path_cleaned, "counts", part)
 
-df = pd.read_csv(file_path, delimiter=";", encoding="ISO-8859-1")
+for part, chunk in enumerate(read_raw_chunks(file_path, args.chunksize)):
+    chunk = add_datum(chunk)
+    df_keys = add_key_hashes(df_keys, key_hashes(watermark(chunk)))
+    n_rows += len(chunk)
 
-# Dictionary to map German month abbreviations to numerical values
-month_mapping = { "JAN.": "01", "JAN": "01", "FEB.": "02", "FEB": "02", "MÄRZ": "03", "APR.": "04", "APR": "04", "APRIL": "04", "MAI.": "05", "MAI": "05", "JUNI": "06", "JULI": "07", "AUG.": "08", "AUG": "08", "SEPT": "09", "SEP.": "09", "OKT.": "10", "OKT": "10", "NOV.": "11", "NOV": "11", "DEZ.": "12", "DEZ": "12" }
+    # Incremental runs first hash the whole export, a key's rows can be spread over several chunks
+    if not incremental:
+        parse(chunk, part)
 
-# Remove rows where DTVMS is less than 0
-df = df[df["DTVMS"] >= 0]
+    elapsed = time.perf_counter() - start
+    print(f"Chunk {part}: {n_rows} rows read, {n_rows / elapsed:,.0f} rows/s")
 
-# Convert the MONAT column to numeric values
-df["MONAT"] = df["MONAT"].str.strip().map(month_mapping)  # Remove extra spaces and map months
+if incremental:
+    df_previous = df_previous.astype({"KEY_HASH": "uint64"})
+    merged = df_keys.merge(df_previous, on=key_columns, how="outer", suffixes=("", "_previous"), indicator=True, validate="one_to_one")
+    is_changed = (merged["_merge"] == "both") & ((merged["KEY_HASH"] != merged["KEY_HASH_previous"]) | (merged["ROWS"] != merged["ROWS_previous"]))
+    changed_keys = merged.loc[(merged["_merge"] == "left_only") | is_changed, key_columns]
+    # Rows that vanished from the export are removed from the store, rows without a month were never stored
+    removed_keys = merged.loc[(merged["_merge"] == "right_only") & merged["DATUM"].notna(), key_columns]
 
-# Create a new DATUM column from JAHR and MONAT
-df["DATUM"] = pd.to_datetime(df["JAHR"].astype(str) + "-" + df["MONAT"] + "-01", format="%Y-%m-%d")
+    # Second pass parsing only the rows of new or changed keys (all rows of the key, the store replaces them together)
+    if len(changed_keys) or len(removed_keys):
+        changed_ids = key_ids(changed_keys)
+        for part, chunk in enumerate(read_raw_chunks(file_path, args.chunksize)):
+            chunk = add_datum(chunk)
+            parse(chunk[np.isin(key_ids(chunk[key_columns]), changed_ids)], part)
 
-# Process the TVMAXT column to extract proper dates
-df["TVMAXT"] = df["TVMAXT"].str.split(",", n=1).str[-1].str.strip()  # Remove everything before ','
-df["TVMAXT"] = pd.to_datetime(df["TVMAXT"] + df["JAHR"].astype(str), format="%d.%m.%Y")
+    # Stored rows whose key is now rejected are removed as well
+    df_rejected_keys = pd.concat(rejected_keys, ignore_index=True) if rejected_keys else removed_keys.iloc[:0]
+    stored_ids = key_ids(merged.loc[merged["_merge"] == "both", key_columns])
+    delete_keys = pd.concat([df_rejected_keys[np.isin(key_ids(df_rejected_keys), stored_ids)], removed_keys], ignore_index=True)
+    changed_stations.update(delete_keys["ZNR"].tolist())
 
-# Create ISTCOVID19
-df["ISTCOVID19"] = ((df["DATUM"] >= pd.to_datetime("2020-02-01")) & (df["DATUM"] <= pd.to_datetime("2022-01-30"))).astype(int)
+    print(f"Incremental run: {n_parsed} new or changed rows, {len(delete_keys)} removed rows")
+    if cleaned_rows:
+        upsert_dataset(pd.concat(cleaned_rows, ignore_index=True), file_path_cleaned, "counts", keys=key_columns, delete=delete_keys)
 
-# Drop the original JAHR and MONAT columns
-df.drop(columns=["JAHR", "MONAT"], inplace=True)
+df_keys.to_parquet(file_path_watermark, index=False)
 
-# Reorder columns to move DATUM to the first position
-column_order = ["DATUM"] + [col for col in df.columns if col != "DATUM"]
-df = df[column_order]
+elapsed = time.perf_counter() - start
+print(f"Read {n_rows} rows, parsed {n_parsed}, rejected {n_rejected} in {elapsed:.1f}s ({n_rows / elapsed:,.0f} rows/s)")
 
-df.to_csv(file_path_cleaned, index=False, encoding="utf-8")
+# Stations touched by this run, downstream forecasting can limit itself to these
+print(f"Changed stations: {len(changed_stations)}")
+pd.DataFrame({"ZNR": sorted(changed_stations)}).to_csv(file_path_changed, index=False)
@@ -1,29 +1,30 @@
 import os
+import sys
 import pandas as pd
-from geopy.distance import geodesic
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.proximity import RADII_M, radius_join, proximity_features
 
 file_path_location = os.path.abspath("data/dauerzaehlstellen_location.csv")
 file_path_transport = os.path.abspath("data/public_transport_location.csv")
 file_path_output = os.path.abspath("data/dauerzaehlstellen_location_public_transport_1km.csv")
+file_path_features = os.path.abspath("data/dauerzaehlstellen_location_public_transport_features.csv")
 
 dauerzaehlstellen_df = pd.read_csv(file_path_location)
 public_transport_df = pd.read_csv(file_path_transport)
 
-results = []
-
-for _, dz_row in dauerzaehlstellen_df.iterrows():
-    dz_coords = (dz_row["LATITUDE"], dz_row["LONGITUDE"])
-    dz_znr = dz_row["ZNR"]
+# All station/stop pairs within the largest radius, found in one KD-tree pass
+pairs = radius_join(dauerzaehlstellen_df, public_transport_df, max(RADII_M))
 
-    for _, pt_row in public_transport_df.iterrows():
-        pt_coords = (pt_row["Latitude"], pt_row["Longitude"])
-        pt_id = pt_row["Id"]
-        
-        distance_km = geodesic(dz_coords, pt_coords).kilometers
-        
-        if distance_km <= 1 :
-            results.append({"ZNR": dz_znr, "Public_Transport_Id": pt_id})
-
-result_df = pd.DataFrame(results)
+# Station/stop pairs within 1 km
+pairs_1km = pairs[pairs["distance_m"] <= 1000]
+result_df = pd.DataFrame({
+    "ZNR": dauerzaehlstellen_df["ZNR"].to_numpy()[pairs_1km["station"]],
+    "Public_Transport_Id": public_transport_df["Id"].to_numpy()[pairs_1km["stop"]],
+})
 
 result_df.to_csv(file_path_output, index=False)
+
+# Stop counts per station for every radius and Kategorie
+features_df = proximity_features(dauerzaehlstellen_df, public_transport_df, pairs)
+features_df.to_csv(file_path_features, index=False)
@@ -1,127 +1,140 @@
 import os
+import sys
+import argparse
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
-from prophet import Prophet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.storage import read_dataset, write_dataset
+from common.daily import expand_groups, group_frame, PROFILE_COLUMNS, TARGET_WEEKDAY, TARGET_TVMAX
+from common.parallel import iter_jobs
+from common.prophet_fit import station_job, fit_station
+
+# File-name suffix of each target's outputs
+TARGET_SUFFIXES = {TARGET_WEEKDAY: "", TARGET_TVMAX: "_tvmax"}
+
+parser = argparse.ArgumentParser(description="Forecast station traffic without corona and estimate the corona effect.")
+parser.add_argument("--targets", nargs="+", choices=list(TARGET_SUFFIXES), default=list(TARGET_SUFFIXES), help="forecast targets, all of them share one data preparation and one job queue")
+parser.add_argument("--workers", type=int, default=1, help="processes fitting stations in parallel, 1 fits them one after another")
+parser.add_argument("--model-cache", default=os.path.abspath("data/model_cache"), help="directory of cached model fits, unchanged station series are not refitted")
+parser.add_argument("--no-model-cache", action="store_true", help="refit every station")
+parser.add_argument("--no-delta-csv", action="store_true", help="hand the corona deltas to the plots in memory without writing district_corona_delta_*.csv")
+args = parser.parse_args()
+
+# The TVMAX corona delta is measured against the weekday corona forecast of the same run, an older file must not be used
+if TARGET_TVMAX in args.targets and TARGET_WEEKDAY not in args.targets:
+    parser.error(f"--targets {TARGET_TVMAX} needs {TARGET_WEEKDAY} as well, its corona delta compares with the weekday corona forecast")
+
+model_cache = None if args.no_model_cache else args.model_cache
 
 corona_start = pd.Timestamp("2020-02-01")
 corona_end = pd.Timestamp("2022-02-01")
 
-df_data = pd.read_csv(os.path.abspath("./data/processed_data/dauerzaehlstellen_data.csv"), sep=",", dtype={"ZNR": str}, parse_dates=["DATUM"])
-df_loc = pd.read_csv("./data/processed_data/dauerzaehlstellen_location.csv", sep=",", dtype={"ZNR": str})
+target_columns = [col for target in args.targets for col in (PROFILE_COLUMNS if target == TARGET_WEEKDAY else [target])]
+
+df_data = read_dataset(os.path.abspath("./data/processed_data/dauerzaehlstellen_data.csv"), "counts", columns=["DATUM", "ZNR", "RINAME", "FZTYP"] + target_columns, filters=[("RINAME", "=", "Gesamt")])
+df_loc = read_dataset(os.path.abspath("./data/processed_data/dauerzaehlstellen_location.csv"), "locations")
 
 district_numbers = df_loc["BEZIRK_NR"].drop_duplicates().sort_values().tolist()
-df_data["FZTYP"] = df_data["FZTYP"].replace("LkwÄ", "Lkw")
+df_data["FZTYP"] = df_data["FZTYP"].astype(str).replace("LkwÄ", "Lkw")
 
 vehicle_types = ["Kfz", "Lkw"]
 
-def make_daily_df(df_area):
-    rows = []
-    for _,r in df_area.iterrows():
-        start = r["DATUM"].replace(day=1)
-        end   = start + pd.offsets.MonthEnd(0)
-        for d in pd.date_range(start, end, freq = "D"):
-            wd = d.weekday()
-            if wd == 0:        y=r["DTVMO"]
-            elif 1 <= wd <= 3: y=r["DTVDD"]
-            elif wd == 4:      y=r["DTVFR"]
-            elif wd == 5:      y=r["DTVSA"]
-            else:              y=r["DTVSF"]
-            rows.append({"ds": d, "y": y})
-
-    return pd.DataFrame(rows).dropna().sort_values("ds").reset_index(drop=True)
-
-def generate_forecast(df_forecast, predict_future_days, file_postfix):
-    for vehicle_type in vehicle_types:
-        print(f"Calculating: {vehicle_type} ...")
+def station_rows(df_period, vehicle_type):
+    """
+    Monthly rows of one vehicle type with their district, ordered by district like the per-district loop.
+    """
+    df_filtered = df_period[(df_period["RINAME"] == "Gesamt") & (df_period["FZTYP"] == vehicle_type)]
 
-        df_filtered = df_forecast[(df_forecast["RINAME"] == "Gesamt") & (df_forecast["FZTYP"] == vehicle_type)]        
+    df = df_filtered.merge(df_loc[["ZNR", "BEZIRK_NR"]], on="ZNR", how="left").dropna(subset=["BEZIRK_NR"])
+    df["BEZIRK_NR"] = df["BEZIRK_NR"].astype(int)
 
-        df = df_filtered.merge(df_loc[["ZNR", "BEZIRK_NR"]], on="ZNR", how="left").dropna(subset=["BEZIRK_NR"])
-        df["BEZIRK_NR"] = df["BEZIRK_NR"].astype(int)
+    return df[df["BEZIRK_NR"].isin(district_numbers)].sort_values("BEZIRK_NR", kind="stable")
 
-        training_rows = []
-        forecast_rows = []
+def generate_forecasts(runs):
+    """
+    Fits every (run, vehicle type, target, station) in one job queue, runs are (monthly data, future days, file postfix).
+    Each vehicle type is filtered once per run and expanded once per target.
+    """
+    groups = []
+    jobs = []
+    slots = []
 
-        for district_number in district_numbers:
-            df_district = df[df["BEZIRK_NR"] == district_number]
+    for df_forecast, predict_future_days, file_postfix in runs:
+        for vehicle_type in vehicle_types:
+            df = station_rows(df_forecast, vehicle_type)
+            station_districts = df.drop_duplicates("ZNR").set_index("ZNR")["BEZIRK_NR"]
 
-            if df_district.empty:
-                continue
+            for target in args.targets:
+                stations = expand_groups(df, by="ZNR", target=target)
+                for station_index in range(len(stations.keys)):
+                    jobs.append(station_job(stations, station_index, predict_future_days, model_cache))
+                    slots.append((len(groups), station_index))
+                groups.append((file_postfix, vehicle_type, target, stations, station_districts))
 
-            for znr in df_district["ZNR"].unique():
-                print(f"Calculating ZNR: {vehicle_type}/{znr} ...")
+    # Results arrive in completion order, their slot keeps each output in station order
+    forecast_rows = [[None] * len(stations.keys) for _, _, _, stations, _ in groups]
 
-                df_znr = df_district[df_district["ZNR"] == znr]
+    for job_index, fc_reduced in iter_jobs(fit_station, jobs, args.workers):
+        group_index, station_index = slots[job_index]
+        file_postfix, vehicle_type, target, stations, station_districts = groups[group_index]
+        znr = stations.keys[station_index]
+        print(f"Calculated ZNR: {file_postfix}/{target}/{vehicle_type}/{znr} ...")
 
-                daily = make_daily_df(df_znr)
-                training_rows.append(daily)
+        fc_reduced["district_number"] = station_districts[znr]
+        fc_reduced["znr"] = znr
 
-                m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-                m.fit(daily[["ds", "y"]])
-                future = m.make_future_dataframe(periods=predict_future_days, freq="D")
-                fc = m.predict(future)
+        fc_reduced["yhat"] = fc_reduced.apply(lambda row: 0.5 * row["yhat_upper"] if row["yhat"] <= 0 else row["yhat"], axis=1) # take 1/2 of yhat_upper on negative yhat
+        fc_reduced["yhat_lower"] = fc_reduced["yhat_lower"].apply(lambda x: max(x, 0))
 
-                fc_reduced = fc[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
-                fc_reduced["district_number"] = district_number
-                fc_reduced["znr"] = znr
-                                
-                fc_reduced["yhat"] = fc_reduced.apply(lambda row: 0.5 * row["yhat_upper"] if row["yhat"] <= 0 else row["yhat"], axis=1) # take 1/2 of yhat_upper on negative yhat
-                fc_reduced["yhat_lower"] = fc_reduced["yhat_lower"].apply(lambda x: max(x, 0))
+        for i in range(1, len(fc_reduced)): # if still negative yhat, take the previous value
+            if fc_reduced.loc[i, "yhat"] <= 0:
+                fc_reduced.loc[i, "yhat"] = fc_reduced.loc[i - 1, "yhat"]
 
-                for i in range(1, len(fc_reduced)): # if still negative yhat, take the previous value
-                    if fc_reduced.loc[i, "yhat"] <= 0:
-                        fc_reduced.loc[i, "yhat"] = fc_reduced.loc[i - 1, "yhat"]
-                
-                forecast_rows.append(fc_reduced)
+        forecast_rows[group_index][station_index] = fc_reduced
 
-        all_trainings = pd.concat(training_rows, ignore_index=True)
-        all_trainings.to_csv(os.path.abspath(f"data/district_training_{file_postfix}_{vehicle_type}.csv"), index=False)
+    for (file_postfix, vehicle_type, target, stations, _), rows in zip(groups, forecast_rows):
+        suffix = TARGET_SUFFIXES[target]
 
-        all_forecasts = pd.concat(forecast_rows, ignore_index=True)
-        all_forecasts.to_csv(os.path.abspath(f"data/district_forecast_{file_postfix}_{vehicle_type}.csv"), index=False)
+        all_trainings = pd.concat([group_frame(stations, station_index) for station_index in range(len(stations.keys))], ignore_index=True)
+        write_dataset(all_trainings, os.path.abspath(f"data/district_training_{file_postfix}_{vehicle_type}{suffix}.csv"), "district_training")
 
-def calculate_corona_delta(df_corona):
-    for vehicle_type in vehicle_types:
-        df_corona_forecast = pd.read_csv(os.path.abspath(f"data/district_forecast_corona_{vehicle_type}.csv"), sep=",", dtype={"znr": str, "district_number": int}, parse_dates=["ds"])
-        df_corona_forecast = df_corona_forecast[(df_corona_forecast["ds"] >= corona_start) & (df_corona_forecast["ds"] <= corona_end)]        
-
-        df_corona_filtered = df_corona[(df_corona["RINAME"] == "Gesamt") & (df_corona["FZTYP"] == vehicle_type)]        
+        all_forecasts = pd.concat(rows, ignore_index=True)
+        write_dataset(all_forecasts, os.path.abspath(f"data/district_forecast_{file_postfix}_{vehicle_type}{suffix}.csv"), "district_forecast")
 
-        df = df_corona_filtered.merge(df_loc[["ZNR", "BEZIRK_NR"]], on="ZNR", how="left").dropna(subset=["BEZIRK_NR"])
-        df["BEZIRK_NR"] = df["BEZIRK_NR"].astype(int)
+def calculate_corona_delta(df_corona, target, write_csv=True):
+    """
+    Observed minus forecast traffic per station and day of the corona period, returned per vehicle type.
+    """
+    corona_deltas = {}
 
-        delta_rows = []
-
-        for district_number in district_numbers:            
-            df_district = df[df["BEZIRK_NR"] == district_number]
+    for vehicle_type in vehicle_types:
+        # Every target is compared with the weekday corona forecast, as the TVMAX script always did
+        df_corona_forecast = read_dataset(os.path.abspath(f"data/district_forecast_corona_{vehicle_type}.csv"), "district_forecast", columns=["ds", "znr", "yhat"], filters=[("YEAR", ">=", corona_start.year), ("YEAR", "<=", corona_end.year)])
+        df_corona_forecast = df_corona_forecast[(df_corona_forecast["ds"] >= corona_start) & (df_corona_forecast["ds"] <= corona_end)]        
 
-            if df_district.empty:
-                continue
+        # Expand every station's corona period at once
+        df = station_rows(df_corona, vehicle_type)
+        stations = expand_groups(df, by="ZNR", target=target)
+        df_daily = pd.DataFrame({"ds": stations.ds, "y": stations.y, "znr": np.repeat(stations.keys, np.diff(stations.offsets))})
 
-            for znr in df_district["ZNR"].unique():
-                print(f"Calculating ZNR: {vehicle_type}/{znr} ...")
+        # One keyed join for all stations, keeps the station and day order of the daily frame
+        df_merged = df_daily.merge(df_corona_forecast, on=["ds", "znr"], how="inner")
+        df_merged["yhat"] = df_merged["yhat"].astype(int)
 
-                df_znr = df_district[df_district["ZNR"] == znr]
+        df_merged["delta"] = df_merged["y"] - df_merged["yhat"]
+        df_merged["delta_percent"] = ((df_merged["delta"] / df_merged["yhat"]) * 100).round(2)
 
-                df_daily = make_daily_df(df_znr)
-                df_daily["district_number"] = district_number 
-                df_daily["znr"] = znr
-                
-                df_merged = pd.merge(df_daily, df_corona_forecast, on=["ds", "znr"], how="inner")
-                df_merged["yhat"] = df_merged["yhat"].astype(int)
-                
-                df_merged["delta"] = df_merged["y"] - df_merged["yhat"]
-                df_merged["delta_percent"] = ((df_merged["delta"] / df_merged["yhat"]) * 100).round(2)                
+        all_deltas = df_merged[["ds", "y", "yhat", "delta", "delta_percent", "znr"]].rename(columns={"y": "traffic_real", "yhat": "traffic_forecast_without_corona"})
 
-                df_delta = df_merged[["ds", "y", "yhat", "delta", "delta_percent", "znr"]].copy()
-                df_delta.rename(columns={"y": "traffic_real"}, inplace=True)
-                df_delta.rename(columns={"yhat": "traffic_forecast_without_corona"}, inplace=True)
+        if write_csv:
+            all_deltas.to_csv(os.path.abspath(f"data/district_corona_delta_{vehicle_type}{TARGET_SUFFIXES[target]}.csv"), index=False)
 
-                delta_rows.append(df_delta)
+        corona_deltas[vehicle_type] = all_deltas
 
-        all_deltas = pd.concat(delta_rows, ignore_index=True)
-        all_deltas.to_csv(os.path.abspath(f"data/district_corona_delta_{vehicle_type}.csv"), index=False)
+    return corona_deltas
 
 def generate_plot(df_until_2032, df_corona_delta, title, file_path_output):
     plot_start = pd.to_datetime("2030-01-01")
@@ -167,17 +180,17 @@ def generate_plot(df_until_2032, df_corona_delta, title, file_path_output):
     #plt.show()
 
 df_pre_corona = df_data[(df_data["DATUM"] < corona_start)]
-generate_forecast(df_pre_corona, 365 * 2, "corona") # predict normal traffic during corona time
-
-generate_forecast(df_data, 365 * 7, "2032") # predict traffic between 2024 and 2032
+generate_forecasts([
+    (df_pre_corona, 365 * 2, "corona"), # predict normal traffic during corona time
+    (df_data, 365 * 7, "2032"), # predict traffic between 2024 and 2032
+])
 
 df_corona = df_data[(df_data["DATUM"] >= corona_start) & (df_data["DATUM"] <= corona_end)]
-calculate_corona_delta(df_corona)
 
-df_until_2032_kfz = pd.read_csv(os.path.abspath("data/district_forecast_2032_Kfz.csv"), sep=",", parse_dates=["ds"])
-df_corona_delta_kfz = pd.read_csv(os.path.abspath("data/district_corona_delta_Kfz.csv"), sep=",", parse_dates=["ds"])
-generate_plot(df_until_2032_kfz, df_corona_delta_kfz, "", os.path.abspath("output/generate_corona_forecast_Kfz.png"))
+for target in args.targets:
+    suffix = TARGET_SUFFIXES[target]
+    corona_deltas = calculate_corona_delta(df_corona, target, write_csv=not args.no_delta_csv)
 
-df_until_2032_lkw = pd.read_csv(os.path.abspath("data/district_forecast_2032_Lkw.csv"), sep=",", parse_dates=["ds"])
-df_corona_delta_lkw = pd.read_csv(os.path.abspath("data/district_corona_delta_Lkw.csv"), sep=",", parse_dates=["ds"])
-generate_plot(df_until_2032_lkw, df_corona_delta_lkw, "", os.path.abspath("output/generate_corona_forecast_Lkw.png"))
+    for vehicle_type in vehicle_types:
+        df_until_2032 = read_dataset(os.path.abspath(f"data/district_forecast_2032_{vehicle_type}{suffix}.csv"), "district_forecast", columns=["ds", "znr", "yhat"], filters=[("YEAR", ">=", 2030)])
+        generate_plot(df_until_2032, corona_deltas[vehicle_type], "", os.path.abspath(f"output/generate_corona_forecast_{vehicle_type}{suffix}.png"))
@@ -1,33 +1,32 @@
 import os
+import sys
+import argparse
 import pandas as pd
-from prophet import Prophet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.storage import read_dataset, write_dataset
+from common.daily import expand_groups, group_frame
+from common.parallel import iter_jobs
+from common.prophet_fit import station_job, fit_station
+
+parser = argparse.ArgumentParser(description="Forecast the daily traffic of every counting station.")
+parser.add_argument("--workers", type=int, default=1, help="processes fitting stations in parallel, 1 fits them one after another")
+parser.add_argument("--model-cache", default=os.path.abspath("data/model_cache"), help="directory of cached model fits, unchanged station series are not refitted")
+parser.add_argument("--no-model-cache", action="store_true", help="refit every station")
+args = parser.parse_args()
+
+model_cache = None if args.no_model_cache else args.model_cache
 
 predict_future_days = 365
 
-df_data = pd.read_csv(os.path.abspath("./data/processed_data/dauerzaehlstellen_data.csv"), sep=",", dtype={"ZNR": str}, parse_dates=["DATUM"])
-df_loc = pd.read_csv("./data/processed_data/dauerzaehlstellen_location.csv", sep=",", dtype={"ZNR": str})
+df_data = read_dataset(os.path.abspath("./data/processed_data/dauerzaehlstellen_data.csv"), "counts", columns=["DATUM", "ZNR", "RINAME", "FZTYP", "DTVMO", "DTVDD", "DTVFR", "DTVSA", "DTVSF"], filters=[("RINAME", "=", "Gesamt")])
+df_loc = read_dataset(os.path.abspath("./data/processed_data/dauerzaehlstellen_location.csv"), "locations")
 
 district_numbers = df_loc["BEZIRK_NR"].drop_duplicates().sort_values().tolist()
-df_data["FZTYP"] = df_data["FZTYP"].replace("LkwÄ", "Lkw")
+df_data["FZTYP"] = df_data["FZTYP"].astype(str).replace("LkwÄ", "Lkw")
 
 vehicle_types = ["Kfz", "Lkw"]
 
-def make_daily_df(df_area):
-    rows = []
-    for _, r in df_area.iterrows():
-        start = r["DATUM"].replace(day=1)
-        end = start + pd.offsets.MonthEnd(0)
-        for d in pd.date_range(start, end, freq="D"):
-            wd = d.weekday()
-            if wd == 0:         y = r["DTVMO"]
-            elif 1 <= wd <= 3:  y = r["DTVDD"]
-            elif wd == 4:       y = r["DTVFR"]
-            elif wd == 5:       y = r["DTVSA"]
-            else:               y = r["DTVSF"]
-            rows.append({"ds": d, "y": y})
-
-    return pd.DataFrame(rows).dropna().sort_values("ds").reset_index(drop=True)
-
 for vehicle_type in vehicle_types:
     print(f"Calculating: {vehicle_type} ...")
 
@@ -36,40 +35,35 @@ for vehicle_type in vehicle_types:
     df = df_filtered.merge(df_loc[["ZNR", "BEZIRK_NR"]], on="ZNR", how="left").dropna(subset=["BEZIRK_NR"])
     df["BEZIRK_NR"] = df["BEZIRK_NR"].astype(int)
 
-    training_rows = []
-    forecast_rows = []
+    # Expand every station in one pass, ordered by district like the per-district loop
+    df = df[df["BEZIRK_NR"].isin(district_numbers)].sort_values("BEZIRK_NR", kind="stable")
+    station_districts = df.drop_duplicates("ZNR").set_index("ZNR")["BEZIRK_NR"]
+    stations = expand_groups(df, by="ZNR")
 
-    for district_number in district_numbers:
-        df_district = df[df["BEZIRK_NR"] == district_number]
-
-        if df_district.empty:
-            continue
-
-        for znr in df_district["ZNR"].unique():
-            print(f"Calculating ZNR: {vehicle_type}/{znr} ...")
-
-            df_znr = df_district[df_district["ZNR"] == znr]
+    training_rows = []
+    for station_index, znr in enumerate(stations.keys):
+        daily = group_frame(stations, station_index)
+        daily["district_number"] = station_districts[znr]
+        training_rows.append(daily)
 
-            daily = make_daily_df(df_znr)
-            daily["district_number"] = district_number
-            training_rows.append(daily)
+    # Results arrive in completion order, their slot keeps the output in station order
+    jobs = [station_job(stations, station_index, predict_future_days, model_cache) for station_index in range(len(stations.keys))]
+    forecast_rows = [None] * len(jobs)
 
-            m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-            m.fit(daily[["ds", "y"]])
-            future = m.make_future_dataframe(periods=predict_future_days, freq="D")
-            fc = m.predict(future)
+    for station_index, fc_reduced in iter_jobs(fit_station, jobs, args.workers):
+        znr = stations.keys[station_index]
+        print(f"Calculated ZNR: {vehicle_type}/{znr} ...")
 
-            fc_reduced = fc[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
-            fc_reduced["district_number"] = district_number
-            fc_reduced["znr"] = znr
+        fc_reduced["district_number"] = station_districts[znr]
+        fc_reduced["znr"] = znr
 
-            fc_reduced["yhat"] = fc_reduced["yhat"].clip(lower=0)
-            fc_reduced["yhat_lower"] = fc_reduced["yhat_lower"].clip(lower=0)
+        fc_reduced["yhat"] = fc_reduced["yhat"].clip(lower=0)
+        fc_reduced["yhat_lower"] = fc_reduced["yhat_lower"].clip(lower=0)
 
-            forecast_rows.append(fc_reduced)
+        forecast_rows[station_index] = fc_reduced
 
     all_trainings = pd.concat(training_rows, ignore_index=True)
-    all_trainings.to_csv(os.path.abspath(f"data/district_training_{vehicle_type}.csv"), index=False)
+    write_dataset(all_trainings, os.path.abspath(f"data/district_training_{vehicle_type}.csv"), "district_training")
 
     all_forecasts = pd.concat(forecast_rows, ignore_index=True)
-    all_forecasts.to_csv(os.path.abspath(f"data/district_forecast_{vehicle_type}.csv"), index=False)
+    write_dataset(all_forecasts, os.path.abspath(f"data/district_forecast_{vehicle_type}.csv"), "district_forecast")
@@ -0,0 +1,99 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.pipeline import Pipeline, script_stage, notebook_stage, copy_stage, STATUS_FAILED, STATUS_BLOCKED
+
+# Every path is relative to this folder and matches what the script or notebook reads and writes from its own cwd
+PROPHET = "prophet_forecasts"
+ARIMA = "dashboard/forecasts_dashboard/data_arima"
+FORECASTS = "dashboard/forecasts_dashboard"
+VEHICLE_TYPES = ["Kfz", "Lkw"]
+
+def prophet_outputs(postfixes, suffix=""):
+    return [f"{PROPHET}/data/district_{kind}_{postfix}{vehicle_type}{suffix}.csv"
+            for kind in ["training", "forecast"] for postfix in postfixes for vehicle_type in VEHICLE_TYPES]
+
+def corona_outputs(suffix):
+    return (prophet_outputs(["corona_", "2032_"], suffix)
+            + [f"{PROPHET}/data/district_corona_delta_{vehicle_type}{suffix}.csv" for vehicle_type in VEHICLE_TYPES]
+            + [f"{PROPHET}/output/generate_corona_forecast_{vehicle_type}{suffix}.png" for vehicle_type in VEHICLE_TYPES])
+
+# Prepared counts and locations, copied to the folders the Prophet scripts and the combine notebook read from.
+# The Prophet scripts read the typed Parquet stores next to the CSV exports, so those are copied along.
+PREPARED = ["dauerzaehlstellen_data.csv", "dauerzaehlstellen_location.csv"]
+PREPARED_STORES = [name.replace(".csv", ".parquet") for name in PREPARED]
+PROPHET_INPUTS = [f"{PROPHET}/data/processed_data/{name}" for name in PREPARED + PREPARED_STORES]
+DASHBOARD_INPUTS = [f"dashboard/data/{name}" for name in PREPARED]
+
+# Exogenous series of the ARIMA notebooks, copied next to the combine notebook which reads them from its own folder
+ARIMA_FINAL = ["auspendler_by_bezirk.csv", "population_by_bezirk.csv", "vehicle_density.csv", "verkehrsmittelwahl.csv"]
+COMBINE_INPUTS = [f"{FORECASTS}/data_arima_final/{name}" for name in ARIMA_FINAL]
+
+STAGES = [
+    script_stage("prep_population", "data/prep_population.py",
+                 ["data/raw/vie-bez-pop-sex-stk-1869f.csv"], ["data/population.csv"]),
+    script_stage("prep_counts", "data/prep_dauerzaehlstellen_data.py",
+                 ["data/raw/dauerzaehlstellen.csv"], ["data/dauerzaehlstellen_data.csv", "data/dauerzaehlstellen_data.parquet", "data/dauerzaehlstellen_rejected.csv"], args=["--incremental"]),
+    script_stage("prep_locations", "data/prep_dauerzaehlstellen_location.py",
+                 ["data/raw/dauerzaehlogd.csv", "data/raw/bezirksgrenzeogd.json"], ["data/dauerzaehlstellen_location.csv", "data/dauerzaehlstellen_location.parquet"]),
+    script_stage("prep_osm_transport", "data/prep_osm_transport.py",
+                 ["data/raw/vienna-public_transport-stop_position.osm", "data/raw/bezirksgrenzeogd.json"], ["data/public_transport_location.csv"]),
+    script_stage("prep_transport_proximity", "data/prep_dauerzaehlstellen_location_public_transport_1km.py",
+                 ["data/dauerzaehlstellen_location.csv", "data/public_transport_location.csv"],
+                 ["data/dauerzaehlstellen_location_public_transport_1km.csv", "data/dauerzaehlstellen_location_public_transport_features.csv"]),
+
+    copy_stage("prophet_inputs", [(f"data/{name}", path) for name, path in zip(PREPARED + PREPARED_STORES, PROPHET_INPUTS)]),
+    copy_stage("dashboard_inputs", [(f"data/{name}", path) for name, path in zip(PREPARED, DASHBOARD_INPUTS)]),
+
+    script_stage("prophet_district", f"{PROPHET}/generate_district_forecast.py", PROPHET_INPUTS, prophet_outputs([""]), cwd=PROPHET),
+    # Weekday DTV and TVMAX targets in one run, each written with its own file suffix
+    script_stage("prophet_corona", f"{PROPHET}/generate_corona_forecast.py", PROPHET_INPUTS, corona_outputs("") + corona_outputs("_tvmax"), cwd=PROPHET),
+
+    notebook_stage("arima_auspendler", f"{ARIMA}/data_arima_cleaning/auspendler.ipynb",
+                   [f"{ARIMA}/data_arima_raw/erwerbsstatistik.csv"], [f"{ARIMA}/data_arima_final/auspendler_by_bezirk.csv"]),
+    notebook_stage("arima_population", f"{ARIMA}/data_arima_cleaning/population.ipynb",
+                   [f"{ARIMA}/data_arima_raw/population_past.csv", f"{ARIMA}/data_arima_raw/population_forecast.csv"],
+                   [f"{ARIMA}/data_arima_final/population_by_bezirk.csv"]),
+    notebook_stage("arima_vehicle_density", f"{ARIMA}/data_arima_cleaning/vehicle_density.ipynb",
+                   [f"{ARIMA}/data_arima_raw/fahrzeuge.csv"], [f"{ARIMA}/data_arima_final/vehicle_density.csv"]),
+    notebook_stage("arima_verkehrswahl", f"{ARIMA}/data_arima_cleaning/verkehrswahl.ipynb",
+                   [f"{ARIMA}/data_arima_raw/verkehrsmittelwahl2022.csv"], [f"{ARIMA}/data_arima_final/verkehrsmittelwahl.csv"]),
+    copy_stage("combine_inputs", [(f"{ARIMA}/data_arima_final/{name}", path) for name, path in zip(ARIMA_FINAL, COMBINE_INPUTS)]),
+
+    notebook_stage("combine_data", f"{FORECASTS}/combine_data.ipynb",
+                   DASHBOARD_INPUTS + COMBINE_INPUTS,
+                   [f"{FORECASTS}/merged_df.csv"]),
+    notebook_stage("forecasting", f"{FORECASTS}/forecasting.ipynb",
+                   [f"{FORECASTS}/merged_df.csv"],
+                   [f"{FORECASTS}/all_counters_forecasts.csv", f"{FORECASTS}/traffic_with_full_series.csv", f"{FORECASTS}/final_traffic_ensemble.csv"]),
+    notebook_stage("clean_forecasts", f"{FORECASTS}/clean_forecasts.ipynb",
+                   [DASHBOARD_INPUTS[1], f"{FORECASTS}/final_traffic_ensemble.csv"],
+                   [f"{FORECASTS}/traffic_dashboard_final.csv"]),
+    script_stage("dashboard_month_bundle", "dashboard/build_month_bundle.py",
+                 [f"{FORECASTS}/traffic_dashboard_final.csv"], ["dashboard/assets/month_bundle.js"]),
+    script_stage("dashboard_serving_data", "dashboard/build_serving_data.py",
+                 [f"{FORECASTS}/traffic_dashboard_final.csv"], [f"{FORECASTS}/traffic_dashboard_final.feather"]),
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stages of the traffic pipeline whose code or inputs changed.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="stages run at the same time")
+    parser.add_argument("--force", nargs="*", default=[], metavar="STAGE", help="run these stages even if they are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only list the stages that would run")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(STAGES, os.path.dirname(os.path.abspath(__file__)))
+
+    unknown = set(args.force) - set(pipeline.stages)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    if args.dry_run:
+        for name, reason in pipeline.plan(args.force):
+            print(f"{name}: {reason}")
+    else:
+        status = pipeline.run(args.jobs, args.force)
+        if any(s in (STATUS_FAILED, STATUS_BLOCKED) for s in status.values()):
+            sys.exit(1)
@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("plotly")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard"))
+from downsample import lttb, minmax, window, line_trace, band_trace
+
+def daily_series(n, seed=0):
+    x = pd.date_range("2024-01-01", periods=n, freq="D").to_numpy()
+    y = np.random.default_rng(seed).normal(1000, 100, n).cumsum()
+    return x, y
+
+@pytest.mark.parametrize("n, n_out", [(10_000, 1500), (1000, 3), (101, 50), (5, 4)])
+def test_lttb_keeps_first_and_last_point(n, n_out):
+    x, y = daily_series(n)
+    idx = lttb(x, y, n_out)
+    assert len(idx) == n_out
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert (np.diff(idx) > 0).all()
+
+@pytest.mark.parametrize("n, n_out", [(10, 10), (10, 20), (10, 2), (0, 5)])
+def test_lttb_short_input_unchanged(n, n_out):
+    x, y = daily_series(n)
+    y[::3] = np.nan
+    np.testing.assert_array_equal(lttb(x, y, n_out), np.arange(n))
+
+def test_minmax_keeps_bin_extremes():
+    y = np.sin(np.linspace(0, 20, 5000))
+    idx = minmax(y, 100)
+    assert len(idx) <= 200
+    assert (np.diff(idx) > 0).all()
+    assert y.argmin() in idx and y.argmax() in idx
+
+def test_minmax_short_input_unchanged():
+    y = np.array([1.0, np.nan, 3.0, 2.0])
+    np.testing.assert_array_equal(minmax(y, 2), np.arange(4))
+
+def test_window_adds_one_point_on_each_side():
+    x, _ = daily_series(100)
+    part = window(x, ("2024-01-10", "2024-01-20"))
+    assert (part.start, part.stop) == (8, 21)
+    assert x[part.start] < np.datetime64("2024-01-10") and x[part.stop - 1] > np.datetime64("2024-01-20")
+
+def test_window_is_clipped_to_the_series():
+    x, _ = daily_series(100)
+    assert window(x, None) == slice(0, 100)
+    part = window(x, ("2023-01-01", "2030-01-01"))
+    assert (part.start, part.stop) == (0, 100)
+
+def test_line_trace_drops_nan_and_bounds_points():
+    x, y = daily_series(5000)
+    y[100:200] = np.nan
+    trace = line_trace(x, y, max_points=500)
+    assert len(trace.y) == 500
+    assert not np.isnan(np.asarray(trace.y, dtype=float)).any()
+
+def test_band_trace_is_one_closed_polygon():
+    x, y = daily_series(5000)
+    trace = band_trace(x, y - 50, y + 50, max_points=400)
+    band_x = np.asarray(trace.x)
+    turn = int(np.argmax(band_x))
+    # Upper edge forward, lower edge back, at most 2 points per bin and edge
+    assert len(band_x) <= 400
+    assert (np.diff(band_x[:turn + 1]) > np.timedelta64(0)).all()
+    assert (np.diff(band_x[turn + 1:]) < np.timedelta64(0)).all()
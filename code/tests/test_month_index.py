@@ -0,0 +1,35 @@
+import os
+import sys
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(CODE_DIR, "dashboard"))
+from month_index import build_month_index, visible_features, STATION_ZOOM, MAX_STATION_MARKERS
+from synthetic_data import synthetic_dashboard_data
+
+DATA_PATH = os.path.join(CODE_DIR, "dashboard", "forecasts_dashboard", "traffic_dashboard_final.csv")
+
+def month_index(df):
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    periods = pd.PeriodIndex(df["DATE"].dt.to_period("M").unique()).sort_values()
+    return build_month_index(df, periods)
+
+def is_district_view(collection):
+    features = collection["features"]
+    return len(features) > 0 and all(f["properties"].get("cluster") for f in features)
+
+def test_low_zoom_shows_districts():
+    month = month_index(pd.read_csv(DATA_PATH))[-1]
+    assert is_district_view(visible_features(month, zoom=STATION_ZOOM - 2))
+    assert is_district_view(visible_features(month))
+
+def test_station_zoom_shows_stations():
+    month = month_index(pd.read_csv(DATA_PATH))[-1]
+    features = visible_features(month, zoom=STATION_ZOOM)["features"]
+    assert len(features) == len(month.znr)
+    assert not any(f["properties"].get("cluster") for f in features)
+
+def test_marker_cap_applies_past_station_zoom():
+    month = month_index(synthetic_dashboard_data(pd.read_csv(DATA_PATH), station_factor=10, month_factor=1))[-1]
+    assert len(month.znr) > MAX_STATION_MARKERS
+    assert is_district_view(visible_features(month, zoom=STATION_ZOOM))
@@ -0,0 +1,36 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.raw_counts import RAW_DTYPES, add_datum, clean_chunk, tvmaxt_dates, REASON_TVMAXT_INVALID
+
+def raw_chunk(tvmaxt):
+    """
+    Raw export rows of January 2020 that differ only in TVMAXT.
+    """
+    n = len(tvmaxt)
+    df = pd.DataFrame({
+        "JAHR": [2020] * n, "MONAT": ["JAN."] * n, "ZNR": list(range(1, n + 1)), "ZNAME": ["Test"] * n,
+        "STRTYP": ["A"] * n, "STRNR": ["A1"] * n, "RINAME": ["Wien"] * n, "FZTYP": ["Kfz"] * n,
+        "DTVMS": [1000.0] * n, "DTVMF": [np.nan] * n, "DTVMO": [np.nan] * n, "DTVDD": [np.nan] * n, "DTVFR": [np.nan] * n,
+        "DTVSA": [np.nan] * n, "DTVSF": [np.nan] * n, "TVMAX": [2000.0] * n, "TVMAXT": tvmaxt,
+    })
+    return add_datum(df.astype(RAW_DTYPES))
+
+def test_tvmaxt_padded_and_unpadded():
+    dates = tvmaxt_dates(raw_chunk(["Mo, 03.01.", "Mo, 3.1.", "Fr, 31.1.*", "Sa, 12.10."]))
+    expected = np.array(["2020-01-03", "2020-01-03", "2020-01-31", "2020-10-12"], dtype="datetime64[ns]")
+    np.testing.assert_array_equal(dates, expected)
+
+def test_tvmaxt_invalid_dates():
+    dates = tvmaxt_dates(raw_chunk(["Mo, 30.2.", "Mo, 1.13.", "Mo, 0.1.", "unbekannt"]))
+    assert np.isnat(dates).all()
+
+def test_missing_tvmaxt_is_kept_as_nat():
+    df, rejected = clean_chunk(raw_chunk(["Mo, 3.1.", None, "", "Mo, 30.2."]))
+    assert df["ZNR"].tolist() == [1, 2, 3]
+    assert df["TVMAXT"].isna().tolist() == [False, True, True]
+    assert rejected["ZNR"].tolist() == [4]
+    assert rejected["REASON"].tolist() == [REASON_TVMAXT_INVALID]